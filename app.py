@@ -1,11 +1,22 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 
 from dotenv import load_dotenv
 import os
-import google.generativeai as genai
+import sys
+import argparse
+import json
+import time
+import queue
+import hashlib
+import gzip
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import wraps
 
 # =============================================================================
 # CONFIGURATION
@@ -18,8 +29,7 @@ st.set_page_config(
 )
 
 load_dotenv()
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-model = genai.GenerativeModel("gemini-2.5-flash")
+MODEL_NAME = "gemini-2.5-flash"
 
 # =============================================================================
 # CUSTOM CSS
@@ -174,64 +184,702 @@ def load_custom_css():
     """, unsafe_allow_html=True)
 
 # =============================================================================
-# DATA LOADING AND PROCESSING
+# DATASET SCHEMA
 # =============================================================================
-@st.cache_data
-def load_data():
-    """Load and preprocess the dataset"""
-    df = pd.read_csv("data.csv")
-    df["Digestive_Issues_Num"] = df["Digestive_Issues"].map({"Yes": 1, "No": 0})
+# column -> (dtype, allowed (min, max) range or categories)
+DATA_SCHEMA = {
+    "Age": ("int8", (0, 120)),
+    "Gender": ("category", ["Female", "Male", "Other"]),
+    "Fast_Food_Meals_Per_Week": ("int8", (0, 50)),
+    "Average_Daily_Calories": ("int16", (0, 10000)),
+    # Measurements stay float64 so slider bounds compare exactly as they did on the CSV values
+    "BMI": ("float64", (10, 80)),
+    "Physical_Activity_Hours_Per_Week": ("float64", (0, 168)),
+    "Sleep_Hours_Per_Day": ("float64", (0, 24)),
+    "Energy_Level_Score": ("int8", (1, 10)),
+    "Digestive_Issues": ("category", ["No", "Yes"]),
+    "Doctor_Visits_Per_Year": ("int16", (0, 365)),
+    "Overall_Health_Score": ("int8", (1, 10)),
+}
+
+# Stored with the columnar copy so a schema change forces a rebuild
+SCHEMA_VERSION = hashlib.sha1(repr(DATA_SCHEMA).encode()).hexdigest()[:12]
+
+def validate_schema(df):
+    """Raise ValueError listing every column that is missing or holds unexpected values"""
+    problems = []
+    
+    for column, (dtype, allowed) in DATA_SCHEMA.items():
+        if column not in df.columns:
+            problems.append(f"{column}: missing column")
+            continue
+        
+        values = df[column]
+        missing = int(values.isna().sum())
+        if missing:
+            problems.append(f"{column}: {missing} missing values")
+        
+        if dtype == "category":
+            unknown = set(values.dropna().unique()) - set(allowed)
+            if unknown:
+                problems.append(f"{column}: unexpected values {sorted(map(str, unknown))}")
+            continue
+        
+        if not pd.api.types.is_numeric_dtype(values):
+            problems.append(f"{column}: expected numbers, got {values.dtype}")
+            continue
+        
+        low, high = allowed
+        out_of_range = int(((values < low) | (values > high)).sum())
+        if out_of_range:
+            problems.append(f"{column}: {out_of_range} values outside {low}–{high}")
+        if dtype.startswith("int") and not (values.dropna() % 1 == 0).all():
+            problems.append(f"{column}: non-integer values")
+    
+    if problems:
+        raise ValueError("Dataset does not match the expected schema:\n" + "\n".join(problems))
+
+def enforce_schema(df):
+    """Validate the raw dataset and convert it to the compact dtypes in DATA_SCHEMA"""
+    validate_schema(df)
+    
+    for column, (dtype, allowed) in DATA_SCHEMA.items():
+        if dtype == "category":
+            df[column] = df[column].astype(pd.CategoricalDtype(allowed))
+        else:
+            df[column] = df[column].astype(dtype)
+    
     return df
 
+def memory_report(before, after):
+    """Compare per-column memory of the raw and schema-enforced frames"""
+    report = pd.DataFrame({
+        'Before (bytes)': before.memory_usage(index=False, deep=True),
+        'After (bytes)': after.memory_usage(index=False, deep=True),
+    })
+    report.loc["Total"] = report.sum()
+    report['Reduction'] = (report['Before (bytes)'] / report['After (bytes)']).round(1).astype(str) + "x"
+    return report
+
+# =============================================================================
+# TRACING
+# =============================================================================
+# Tracing is on when any of its outputs is: the in-app panel, a JSON-lines file or a Prometheus endpoint
+TRACE_PANEL = os.getenv("SNACKALYZE_TRACE_PANEL", "") not in ("", "0")
+TRACE_FILE = os.getenv("SNACKALYZE_TRACE_FILE", "")
+TRACE_METRICS_PORT = int(os.getenv("SNACKALYZE_METRICS_PORT", "0"))
+TRACE_ENABLED = TRACE_PANEL or bool(TRACE_FILE) or TRACE_METRICS_PORT > 0
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+TRACE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Open spans of the current thread, outermost first
+TRACE_STATE = threading.local()
+
+def active_spans():
+    stack = getattr(TRACE_STATE, "stack", None)
+    if stack is None:
+        stack = TRACE_STATE.stack = []
+    return stack
+
+class Span:
+    """One timed stage; spans opened inside it on the same thread become its children"""
+    
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+        self.error = None
+        self.seconds = 0.0
+    
+    def __enter__(self):
+        stack = active_spans()
+        self.parent = stack[-1] if stack else None
+        self.trace_id = self.parent.trace_id if self.parent else os.urandom(8).hex()
+        self.span_id = os.urandom(8).hex()
+        self.thread = threading.current_thread().name
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        stack.append(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self.started
+        active_spans().pop()
+        # Reruns and st.stop() unwind through spans as BaseExceptions; they are not failures
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.error = exc_type.__name__
+        if self.parent is not None:
+            self.parent.children.append(self)
+        get_trace_store().record(self)
+        return False
+    
+    def to_dict(self):
+        return {
+            'trace': self.trace_id,
+            'span': self.span_id,
+            'parent': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'start': self.started_at,
+            'ms': self.seconds * 1000,
+            'thread': self.thread,
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+NO_SPAN = nullcontext()
+
+def trace_span(name, **attributes):
+    """Context manager timing one stage as a span; a shared no-op when tracing is off"""
+    if not TRACE_ENABLED:
+        return NO_SPAN
+    return Span(name, attributes)
+
+def traced(func):
+    """Trace every call of func as a span named after it; func is returned untouched when tracing is off"""
+    if not TRACE_ENABLED:
+        return func
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with Span(func.__qualname__, {}):
+            return func(*args, **kwargs)
+    return wrapper
+
+def current_trace():
+    """The outermost open span on this thread, or None"""
+    stack = active_spans()
+    return stack[0] if stack else None
+
+def prometheus_label(value):
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+class TraceStore:
+    """Per-stage latency histograms for this server process, plus the optional JSON-lines export"""
+    
+    def __init__(self, path=None):
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+    
+    def record(self, span):
+        with self._lock:
+            stage = self.stages.setdefault(span.name, {
+                'count': 0, 'sum': 0.0, 'max': 0.0, 'errors': 0, 'buckets': [0] * len(TRACE_BUCKETS)
+            })
+            stage['count'] += 1
+            stage['sum'] += span.seconds
+            stage['max'] = max(stage['max'], span.seconds)
+            stage['errors'] += span.error is not None
+            # Buckets are cumulative, as Prometheus expects
+            for i, bound in enumerate(TRACE_BUCKETS):
+                if span.seconds <= bound:
+                    stage['buckets'][i] += 1
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if span.parent is None:
+                    self._file.flush()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    'count': stage['count'],
+                    'mean_ms': stage['sum'] / stage['count'] * 1000,
+                    'max_ms': stage['max'] * 1000,
+                    'total_s': stage['sum'],
+                    'errors': stage['errors'],
+                }
+                for name, stage in self.stages.items()
+            }
+    
+    def prometheus_text(self):
+        """The stage histograms in the Prometheus text exposition format"""
+        seconds = [
+            "# HELP snackalyze_stage_seconds Time spent in each traced stage",
+            "# TYPE snackalyze_stage_seconds histogram",
+        ]
+        errors = [
+            "# HELP snackalyze_stage_errors_total Traced stage runs that raised an exception",
+            "# TYPE snackalyze_stage_errors_total counter",
+        ]
+        with self._lock:
+            for name, stage in sorted(self.stages.items()):
+                label = f"stage={prometheus_label(name)}"
+                for bound, count in zip(TRACE_BUCKETS, stage['buckets']):
+                    seconds.append(f'snackalyze_stage_seconds_bucket{{{label},le="{bound}"}} {count}')
+                seconds.append(f'snackalyze_stage_seconds_bucket{{{label},le="+Inf"}} {stage["count"]}')
+                seconds.append(f"snackalyze_stage_seconds_sum{{{label}}} {stage['sum']}")
+                seconds.append(f"snackalyze_stage_seconds_count{{{label}}} {stage['count']}")
+                errors.append(f"snackalyze_stage_errors_total{{{label}}} {stage['errors']}")
+        return "\n".join(seconds + errors) + "\n"
+
+def serve_metrics(store, port):
+    """Serve the store's histograms at /metrics on port from a daemon thread"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = store.prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="snackalyze-metrics", daemon=True).start()
+    return server
+
+@st.cache_resource
+def get_trace_store():
+    """Stage histograms shared by all sessions, exported to TRACE_FILE and TRACE_METRICS_PORT when set"""
+    store = TraceStore(TRACE_FILE or None)
+    if TRACE_METRICS_PORT:
+        serve_metrics(store, TRACE_METRICS_PORT)
+    return store
+
+# =============================================================================
+# DATA LOADING AND PROCESSING
+# =============================================================================
+# Risk rules: (column, comparison, [(threshold, points), ...]).
+# Thresholds are checked in order and the first match wins.
+RISK_RULES = [
+    ("BMI", ">", [(30, 25), (25, 15), (22, 8)]),
+    ("Fast_Food_Meals_Per_Week", ">", [(10, 20), (6, 12), (3, 6)]),
+    ("Sleep_Hours_Per_Day", "<", [(5, 15), (6, 10), (7, 5)]),
+    ("Physical_Activity_Hours_Per_Week", "<", [(1, 10), (3, 6), (5, 3)]),
+    ("Energy_Level_Score", "<", [(3, 10), (5, 6), (7, 3)]),
+]
+
+RISK_COLUMNS = [column for column, _, _ in RISK_RULES]
+
+@traced
+def score_health_risk(data):
+    """Calculate health risk scores (0-100) for a whole DataFrame or dict of columns at once"""
+    score = None
+    
+    for column, comparison, thresholds in RISK_RULES:
+        values = np.asarray(data[column], dtype="float64")
+        if comparison == ">":
+            conditions = [values > threshold for threshold, _ in thresholds]
+        else:
+            conditions = [values < threshold for threshold, _ in thresholds]
+        points = np.select(conditions, [p for _, p in thresholds], default=0)
+        score = points if score is None else score + points
+    
+    return np.minimum(score, 100)
+
 def calculate_health_risk(row):
-    """Calculate health risk score (0-100) based on multiple factors"""
-    score = 0
-    
-    # BMI contribution
-    if row["BMI"] > 30:
-        score += 25
-    elif row["BMI"] > 25:
-        score += 15
-    elif row["BMI"] > 22:
-        score += 8
-    
-    # Fast food contribution
-    if row["Fast_Food_Meals_Per_Week"] > 10:
-        score += 20
-    elif row["Fast_Food_Meals_Per_Week"] > 6:
-        score += 12
-    elif row["Fast_Food_Meals_Per_Week"] > 3:
-        score += 6
-    
-    # Sleep contribution
-    if row["Sleep_Hours_Per_Day"] < 5:
-        score += 15
-    elif row["Sleep_Hours_Per_Day"] < 6:
-        score += 10
-    elif row["Sleep_Hours_Per_Day"] < 7:
-        score += 5
-    
-    # Physical activity contribution
-    if row["Physical_Activity_Hours_Per_Week"] < 1:
-        score += 10
-    elif row["Physical_Activity_Hours_Per_Week"] < 3:
-        score += 6
-    elif row["Physical_Activity_Hours_Per_Week"] < 5:
-        score += 3
-    
-    # Energy level contribution
-    if row["Energy_Level_Score"] < 3:
-        score += 10
-    elif row["Energy_Level_Score"] < 5:
-        score += 6
-    elif row["Energy_Level_Score"] < 7:
-        score += 3
-    
-    return min(score, 100)
-
-def apply_filters(df, filters):
+    """Calculate health risk score (0-100) for a single row"""
+    return int(score_health_risk({column: [row[column]] for column in RISK_COLUMNS})[0])
+
+# Bumped automatically whenever the scoring rules change, so cached data with
+# stale derived columns is never served.
+DERIVED_COLUMNS_VERSION = hashlib.sha1(repr(RISK_RULES).encode()).hexdigest()[:12]
+
+def add_derived_columns(df):
+    """Add the columns that depend only on a row's own values"""
+    df["Digestive_Issues_Num"] = (df["Digestive_Issues"] == "Yes").astype("int8")
+    df["Health_Risk_Score"] = score_health_risk(df).astype("int8")
+    return df
+
+DATA_PATH = "data.csv"
+COLUMNAR_CACHE_DIR = os.getenv("SNACKALYZE_CACHE_DIR", ".snackalyze_cache")
+
+def file_fingerprint(path):
+    """Cheap change detector for a file: modification time and size"""
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Content hash of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_dataset_version(path=DATA_PATH):
+    """Identify the current dataset: source file state, schema and scoring rules"""
+    fingerprint = file_fingerprint(path)
+    return f"{fingerprint['mtime_ns']}-{fingerprint['size']}-{SCHEMA_VERSION}-{DERIVED_COLUMNS_VERSION}"
+
+def write_manifest(manifest_path, csv_path, digest, memory=None):
+    """Record which version of the CSV the columnar file was built from"""
+    manifest = {**file_fingerprint(csv_path), 'sha256': digest, 'schema': SCHEMA_VERSION, 'memory': memory}
+    tmp_path = f"{manifest_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+@traced
+def build_columnar(csv_path, feather_path, manifest_path, digest):
+    """Convert the CSV into an uncompressed Feather file that can be memory-mapped"""
+    os.makedirs(os.path.dirname(feather_path) or ".", exist_ok=True)
+    raw = pd.read_csv(csv_path)
+    df = enforce_schema(raw.copy())
+    report = memory_report(raw, df)
+    del raw
+    
+    # Unique per writer, so workers building at the same time never publish each other's partial file
+    tmp_path = f"{feather_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.reset_index(drop=True).to_feather(tmp_path, compression="uncompressed")
+    os.replace(tmp_path, feather_path)
+    write_manifest(manifest_path, csv_path, digest, report.to_dict(orient="index"))
+
+@traced
+def read_columnar(csv_path, cache_dir=COLUMNAR_CACHE_DIR):
+    """Load the dataset from its columnar copy, rebuilding it when the CSV changes"""
+    from pyarrow import feather
+    
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    feather_path = os.path.join(cache_dir, stem + ".feather")
+    manifest_path = os.path.join(cache_dir, stem + ".json")
+    
+    manifest = None
+    if os.path.exists(feather_path) and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    
+    fingerprint = file_fingerprint(csv_path)
+    if manifest is None or manifest.get('schema') != SCHEMA_VERSION:
+        build_columnar(csv_path, feather_path, manifest_path, file_sha256(csv_path))
+    elif (manifest['mtime_ns'], manifest['size']) != (fingerprint['mtime_ns'], fingerprint['size']):
+        # The file was touched; only rebuild if its contents actually changed
+        digest = file_sha256(csv_path)
+        if digest == manifest['sha256']:
+            write_manifest(manifest_path, csv_path, digest, manifest.get('memory'))
+        else:
+            build_columnar(csv_path, feather_path, manifest_path, digest)
+    
+    table = feather.read_table(feather_path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def load_memory_report(csv_path=DATA_PATH, cache_dir=COLUMNAR_CACHE_DIR):
+    """Per-column memory before and after the schema, as recorded when the columnar file was built"""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    manifest_path = os.path.join(cache_dir, stem + ".json")
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        memory = json.load(f).get('memory')
+    return pd.DataFrame.from_dict(memory, orient="index") if memory else None
+
+class ReadOnlyFrame(pd.DataFrame):
+    """A DataFrame shared by every session: reading and deriving new frames work, changing it in place raises"""
+    
+    @property
+    def _constructor(self):
+        # Filtered, sliced or computed results are ordinary frames the caller owns
+        return pd.DataFrame
+    
+    def _refuse(self, action):
+        raise TypeError(
+            f"The shared dataset is read-only ({action}); "
+            "build a new frame instead, e.g. df.assign(...) or df.copy()"
+        )
+    
+    def __setitem__(self, key, value):
+        self._refuse(f"setting column {key!r}")
+    
+    def __delitem__(self, key):
+        self._refuse(f"deleting column {key!r}")
+    
+    def __setattr__(self, name, value):
+        if name in ("columns", "index"):
+            self._refuse(f"replacing .{name}")
+        super().__setattr__(name, value)
+    
+    def insert(self, *args, **kwargs):
+        self._refuse("insert()")
+    
+    def pop(self, *args, **kwargs):
+        self._refuse("pop()")
+    
+    def update(self, *args, **kwargs):
+        self._refuse("update()")
+
+def refuse_inplace(name):
+    """Wrap a DataFrame method so calling it with inplace=True on a ReadOnlyFrame raises"""
+    method = getattr(pd.DataFrame, name)
+    
+    def guarded(self, *args, **kwargs):
+        if kwargs.get("inplace"):
+            self._refuse(f"{name}(inplace=True)")
+        return method(self, *args, **kwargs)
+    
+    guarded.__name__ = name
+    guarded.__doc__ = method.__doc__
+    return guarded
+
+for _name in (
+    "fillna", "ffill", "bfill", "replace", "interpolate", "clip", "where", "mask",
+    "drop", "dropna", "drop_duplicates", "rename", "rename_axis", "set_index", "reset_index",
+    "sort_values", "sort_index", "eval", "query",
+):
+    setattr(ReadOnlyFrame, _name, refuse_inplace(_name))
+
+def freeze_frame(df):
+    """Share df's column arrays, marked read-only, as a ReadOnlyFrame (no data is copied)"""
+    columns = {}
+    for col in df.columns:
+        values = df[col].array
+        if isinstance(values, pd.Categorical):
+            # .codes is already a read-only view of the category codes
+            columns[col] = pd.Categorical.from_codes(values.codes, dtype=values.dtype)
+        else:
+            array = df[col].to_numpy(copy=False)
+            array.flags.writeable = False
+            columns[col] = array
+    return ReadOnlyFrame(columns, index=df.index, copy=False)
+
+# Per-version resources keep one entry: a new dataset version evicts the old frame, indexes and caches
+@st.cache_resource(max_entries=1)
+def load_data(dataset_version):
+    """Load and preprocess the dataset once per version; every session shares the same read-only frame"""
+    df = read_columnar(DATA_PATH)
+    return freeze_frame(add_derived_columns(df))
+
+class DatasetProfile:
+    """Summary statistics of a frame (count, mean, std, min, quantiles, max, unique values, category counts)"""
+    
+    def __init__(self, rows, numeric, categories):
+        self.rows = rows
+        self.numeric = numeric
+        self.categories = categories
+    
+    @classmethod
+    def from_frame(cls, df):
+        numeric_columns = df.select_dtypes(include="number").columns
+        numeric = df[numeric_columns].describe(percentiles=[0.25, 0.5, 0.75])
+        numeric.loc['unique'] = df[numeric_columns].nunique()
+        # Category counts keep the order values first appear in, as unique() would
+        categories = {
+            col: df[col].value_counts().reindex(list(df[col].unique()))
+            for col in df.columns.difference(numeric_columns, sort=False)
+        }
+        return cls(len(df), numeric, categories)
+    
+    @classmethod
+    def from_cube(cls, cube):
+        """Row count, ranges, means and category counts of a whole streamed file, read off its cube"""
+        rows = int(cube.cells["count"].sum())
+        numeric = pd.DataFrame({
+            column: {'count': rows, 'min': low, 'max': high} for column, (low, high) in cube.bounds.items()
+        })
+        for column in CUBE_MEASURES:
+            numeric.loc['count', column] = rows
+            numeric.loc['mean', column] = cube.cells[column + "_sum"].sum() / rows
+        categories = {
+            col: cube.cells.groupby(level=col, observed=True)["count"].sum().astype("int64")
+            for col in ["Gender", "Digestive_Issues"]
+        }
+        return cls(rows, numeric, categories)
+    
+    def stat(self, col, name):
+        return self.numeric.at[name, col]
+    
+    def mean(self, col):
+        return self.stat(col, 'mean')
+    
+    def range(self, col):
+        return self.stat(col, 'min'), self.stat(col, 'max')
+    
+    def values(self, col):
+        """Distinct values of a categorical column, in order of first appearance"""
+        return list(self.categories[col].index)
+    
+    def describe(self, columns):
+        """The same table as DataFrame.describe() for numeric columns"""
+        return self.numeric.loc[['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'], columns]
+
+@st.cache_resource(max_entries=1)
+def get_dataset_profile(_df, dataset_version):
+    """Profile of the loaded data, computed once per dataset version"""
+    return DatasetProfile.from_frame(_df)
+
+# Sidebar range filters: filters dict key -> column
+RANGE_FILTERS = {
+    'age': "Age",
+    'bmi': "BMI",
+    'fastfood': "Fast_Food_Meals_Per_Week",
+    'energy': "Energy_Level_Score",
+    'activity': "Physical_Activity_Hours_Per_Week",
+    'sleep': "Sleep_Hours_Per_Day",
+}
+
+CATEGORY_FILTER_COLUMNS = ["Gender", "Digestive_Issues"]
+
+class FilterIndex:
+    """Sorted per-column row indexes that answer the sidebar filters without scanning rows"""
+    
+    def __init__(self, df):
+        self.num_rows = len(df)
+        self.sorted_ids = {}
+        self.sorted_values = {}
+        self.groups = {}
+        self.has_missing = {}
+        
+        for column in RANGE_FILTERS.values():
+            values = df[column].to_numpy()
+            order = np.argsort(values, kind="stable")
+            self.sorted_ids[column] = order
+            self.sorted_values[column] = values[order]
+        
+        for column in CATEGORY_FILTER_COLUMNS:
+            codes, uniques = pd.factorize(df[column])
+            self.groups[column] = {value: np.flatnonzero(codes == i) for i, value in enumerate(uniques)}
+            self.has_missing[column] = bool((codes < 0).any())
+    
+    def range_ids(self, column, low, high):
+        """Row ids with low <= value <= high"""
+        values = self.sorted_values[column]
+        start = np.searchsorted(values, low, side="left")
+        end = np.searchsorted(values, high, side="right")
+        return self.sorted_ids[column][start:end]
+    
+    def isin_ids(self, column, options):
+        """Row ids whose value is one of options"""
+        ids = [self.groups[column][value] for value in options if value in self.groups[column]]
+        return np.concatenate(ids) if ids else np.empty(0, dtype=np.intp)
+    
+    def covers_range(self, column, low, high):
+        """True when [low, high] keeps every row, e.g. a slider left at its defaults"""
+        values = self.sorted_values[column]
+        # NaN sorts last, so a column with missing values never counts as covered
+        return low <= values[0] and high >= values[-1]
+    
+    def covers_options(self, column, options):
+        """True when options keep every row of a categorical column"""
+        return not self.has_missing[column] and set(self.groups[column]).issubset(options)
+    
+    def lookup(self, filters):
+        """Return sorted row ids matching the filters, or None when no predicate removes anything"""
+        if self.num_rows == 0:
+            return None
+        
+        id_sets = []
+        if filters['gender'] != "All":
+            id_sets.append(self.isin_ids("Gender", [filters['gender']]))
+        if not self.covers_options("Digestive_Issues", filters['digestive']):
+            id_sets.append(self.isin_ids("Digestive_Issues", filters['digestive']))
+        for key, column in RANGE_FILTERS.items():
+            low, high = filters[key]
+            if not self.covers_range(column, low, high):
+                id_sets.append(self.range_ids(column, low, high))
+        
+        if not id_sets:
+            return None
+        
+        # Intersect starting from the most selective predicate
+        id_sets.sort(key=len)
+        ids = id_sets[0]
+        member = np.zeros(self.num_rows, dtype=bool)
+        for other in id_sets[1:]:
+            if len(ids) == 0:
+                break
+            member[:] = False
+            member[other] = True
+            ids = ids[member[ids]]
+        
+        return np.sort(ids)
+
+class LRUCache:
+    """Thread-safe least-recently-used cache bounded by entry count and total bytes"""
+    
+    def __init__(self, max_entries=128, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or sys.getsizeof
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+            return default
+    
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or
+                (self.max_bytes is not None and self.total_bytes > self.max_bytes)
+            ):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+            }
+
+FILTER_CACHE_MAX_ENTRIES = int(os.getenv("SNACKALYZE_FILTER_CACHE_ENTRIES", "64"))
+FILTER_CACHE_MAX_MB = float(os.getenv("SNACKALYZE_FILTER_CACHE_MB", "256"))
+
+def normalize_filters(filters):
+    """Turn a filters dict into a hashable key that ignores ordering and numeric types"""
+    def normalize(value):
+        if isinstance(value, (list, set)):
+            return tuple(sorted(value))
+        if isinstance(value, tuple):
+            return tuple(round(float(v), 6) for v in value)
+        return value
+    
+    return tuple(sorted((key, normalize(value)) for key, value in filters.items()))
+
+def frame_nbytes(df):
+    """Approximate memory held by a DataFrame"""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+@st.cache_resource(max_entries=1)
+def get_filter_cache(dataset_version):
+    """Filter results cache shared by all sessions for one dataset version"""
+    return LRUCache(
+        max_entries=FILTER_CACHE_MAX_ENTRIES,
+        max_bytes=int(FILTER_CACHE_MAX_MB * 1024 * 1024),
+        sizeof=frame_nbytes
+    )
+
+@st.cache_resource(max_entries=1)
+def get_filter_index(_df, dataset_version):
+    """Build the filter index once per dataset version and share it across sessions"""
+    return FilterIndex(_df)
+
+@traced
+def apply_filters(df, filters, index=None):
     """Apply all selected filters to the dataframe"""
-    filtered_df = df.copy()
+    if index is not None:
+        ids = index.lookup(filters)
+        return df if ids is None else df.take(ids)
+    
+    # Reference implementation used when no index is available
+    filtered_df = df
     
     if filters['gender'] != "All":
         filtered_df = filtered_df[filtered_df["Gender"] == filters['gender']]
@@ -254,9 +902,1300 @@ def apply_filters(df, filters):
     
     return filtered_df
 
+@traced
+def cached_apply_filters(df, filters, index, cache):
+    """Serve filter results from the shared cache, filtering only on a miss"""
+    key = normalize_filters(filters)
+    filtered_df = cache.get(key)
+    if filtered_df is None:
+        filtered_df = apply_filters(df, filters, index)
+        # Every session gets this same object from the cache, so it must refuse writes too
+        if not isinstance(filtered_df, ReadOnlyFrame):
+            filtered_df = freeze_frame(filtered_df)
+        cache.put(key, filtered_df)
+    return filtered_df
+
+# =============================================================================
+# CHUNKED INGESTION AND AGGREGATES
+# =============================================================================
+STREAM_MEMORY_MB = float(os.getenv("SNACKALYZE_STREAM_MEMORY_MB", "64"))
+STREAMING_THRESHOLD_MB = float(os.getenv("SNACKALYZE_STREAMING_THRESHOLD_MB", "512"))
+STREAM_SAMPLE_ROWS = int(os.getenv("SNACKALYZE_STREAM_SAMPLE_ROWS", "100000"))
+
+# Columns whose overall means feed the metric cards and AI prompt
+MEAN_COLUMNS = [
+    "Fast_Food_Meals_Per_Week",
+    "BMI",
+    "Energy_Level_Score",
+    "Sleep_Hours_Per_Day",
+    "Physical_Activity_Hours_Per_Week",
+    "Health_Risk_Score",
+    "Overall_Health_Score",
+]
+
+CELL_KEYS = ["Fast_Food_Meals_Per_Week", "Digestive_Issues"]
+CELL_SUMS = ["BMI", "Average_Daily_Calories", "Doctor_Visits_Per_Year"]
+
+class DashboardAggregates:
+    """Mergeable sums and counts behind the Dashboard and Insights charts"""
+    
+    def __init__(self):
+        self.count = 0
+        self.sums = pd.Series(0.0, index=MEAN_COLUMNS)
+        self.sumsq = pd.Series(0.0, index=MEAN_COLUMNS)
+        # One row per (fast food, digestive) cell: row count plus column sums
+        self.cells = pd.DataFrame(columns=["count"] + CELL_SUMS, dtype="float64")
+    
+    @classmethod
+    @traced
+    def from_frame(cls, df):
+        return cls().update(df)
+    
+    def update(self, df):
+        """Fold a block of rows into the running totals"""
+        if len(df) == 0:
+            return self
+        
+        cells = df.groupby(CELL_KEYS, observed=True).agg(
+            count=("BMI", "size"),
+            **{column: (column, "sum") for column in CELL_SUMS}
+        ).astype("float64")
+        
+        values = df[MEAN_COLUMNS].astype("float64")
+        self.count += len(df)
+        self.sums = self.sums + values.sum()
+        self.sumsq = self.sumsq + (values ** 2).sum()
+        self.cells = cells if self.cells.empty else self.cells.add(cells, fill_value=0)
+        return self
+    
+    def merge(self, other):
+        """Combine totals computed over a disjoint set of rows"""
+        if other.count:
+            self.count += other.count
+            self.sums = self.sums + other.sums
+            self.sumsq = self.sumsq + other.sumsq
+            self.cells = other.cells if self.cells.empty else self.cells.add(other.cells, fill_value=0)
+        return self
+    
+    def mean(self, column):
+        return self.sums[column] / self.count if self.count else float("nan")
+    
+    def std(self, column):
+        """Sample standard deviation from the running sums"""
+        if self.count < 2:
+            return float("nan")
+        variance = (self.sumsq[column] - self.sums[column] ** 2 / self.count) / (self.count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+    
+    def _by(self, key, column):
+        grouped = self.cells.groupby(level=key, observed=True)[["count", column]].sum()
+        grouped[column] = grouped[column] / grouped["count"]
+        return grouped[[column]].reset_index()
+    
+    def bmi_by_fastfood(self):
+        return self._by("Fast_Food_Meals_Per_Week", "BMI")
+    
+    def calories_by_fastfood(self):
+        return self._by("Fast_Food_Meals_Per_Week", "Average_Daily_Calories")
+    
+    def doctor_visits_by_digestive(self):
+        return self._by("Digestive_Issues", "Doctor_Visits_Per_Year")
+    
+    def digestive_counts(self):
+        counts = self.cells.groupby(level="Digestive_Issues", observed=True)["count"].sum().astype("int64")
+        return counts[counts > 0].sort_values(ascending=False)
+    
+    def fastfood_digestive_counts(self):
+        counts = self.cells["count"].astype("int64").rename("count").reset_index()
+        return counts[counts["count"] > 0]
+
+def chunk_rows_for_budget(path, memory_mb=STREAM_MEMORY_MB, sample_rows=1000):
+    """Pick a chunk size so that parsing, converting and filtering one chunk stays within memory_mb"""
+    sample = pd.read_csv(path, nrows=sample_rows)
+    bytes_per_row = max(frame_nbytes(sample) / max(len(sample), 1), 1)
+    # Raw chunk, schema-converted chunk and its filtered slice can be alive at once
+    return max(int(memory_mb * 1024 * 1024 / (bytes_per_row * 3)), 1000)
+
+def iter_chunks(path, chunk_rows=None):
+    """Stream the CSV in fixed-size blocks with the schema and derived columns applied"""
+    chunk_rows = chunk_rows or chunk_rows_for_budget(path)
+    for chunk in pd.read_csv(path, chunksize=chunk_rows):
+        yield add_derived_columns(enforce_schema(chunk))
+
+@traced
+def stream_aggregates(path, filters=None, chunk_rows=None):
+    """Filter and aggregate the CSV one chunk at a time without loading it whole"""
+    aggregates = DashboardAggregates()
+    for chunk in iter_chunks(path, chunk_rows):
+        # Each chunk is summarized on its own, then only its small totals are folded in
+        aggregates.merge(DashboardAggregates.from_frame(chunk if filters is None else apply_filters(chunk, filters)))
+    return aggregates
+
+def stream_sample(path, sample_rows=STREAM_SAMPLE_ROWS, chunk_rows=None, seed=42):
+    """Uniform random sample of rows (bottom-k by random key), kept bounded while streaming"""
+    rng = np.random.default_rng(seed)
+    sample = None
+    for chunk in iter_chunks(path, chunk_rows):
+        chunk["_sample_key"] = rng.random(len(chunk))
+        sample = chunk if sample is None else pd.concat([sample, chunk])
+        sample = sample.nsmallest(sample_rows, "_sample_key")
+    
+    if sample is None:
+        return add_derived_columns(enforce_schema(pd.read_csv(path)))
+    return sample.sort_index().drop(columns="_sample_key").reset_index(drop=True)
+
+AGE_BUCKET_YEARS = 5
+
+# Discrete dimensions of the aggregate cube; Age is bucketed into AGE_BUCKET_YEARS bands
+CUBE_DIMS = ["Gender", "Fast_Food_Meals_Per_Week", "Age_Bucket", "Energy_Level_Score", "Digestive_Issues"]
+CUBE_MEASURES = list(dict.fromkeys(MEAN_COLUMNS + CELL_SUMS))
+# Continuous filters the cube can only answer when they keep every row
+CUBE_FULL_RANGE_FILTERS = ['bmi', 'activity', 'sleep']
+
+class AggregateCube:
+    """Counts, sums and sums of squares per cell of the discrete filter dimensions"""
+    
+    def __init__(self):
+        self.cells = None
+        self.bounds = {}
+    
+    @classmethod
+    @traced
+    def from_frame(cls, df):
+        return cls().update(df)
+    
+    @classmethod
+    def from_chunks(cls, chunks):
+        cube = cls()
+        for chunk in chunks:
+            cube.update(chunk)
+        return cube
+    
+    def update(self, df):
+        """Fold new rows into the cube"""
+        if len(df) == 0:
+            return self
+        
+        measures = df[CUBE_MEASURES].astype("float64")
+        frame = pd.concat([
+            df[["Gender", "Fast_Food_Meals_Per_Week", "Energy_Level_Score", "Digestive_Issues"]],
+            ((df["Age"] // AGE_BUCKET_YEARS) * AGE_BUCKET_YEARS).rename("Age_Bucket"),
+            measures.add_suffix("_sum"),
+            (measures ** 2).add_suffix("_sumsq"),
+        ], axis=1)
+        frame["count"] = 1.0
+        cells = frame.groupby(CUBE_DIMS, observed=True).sum()
+        
+        self.cells = cells if self.cells is None else self.cells.add(cells, fill_value=0)
+        self._flat = self.cells.reset_index()
+        
+        for column in RANGE_FILTERS.values():
+            low, high = df[column].min(), df[column].max()
+            if column in self.bounds:
+                low, high = min(low, self.bounds[column][0]), max(high, self.bounds[column][1])
+            self.bounds[column] = (low, high)
+        return self
+    
+    def _covers(self, column, low, high):
+        col_min, col_max = self.bounds[column]
+        return low <= col_min and high >= col_max
+    
+    def _age_bucket_range(self, low, high):
+        """Bucket starts selected by an age range, or None when it splits a bucket"""
+        col_min, col_max = self.bounds["Age"]
+        if low <= col_min:
+            first = -np.inf
+        elif low % AGE_BUCKET_YEARS == 0:
+            first = low
+        else:
+            return None
+        if high >= col_max:
+            last = np.inf
+        elif (high + 1) % AGE_BUCKET_YEARS == 0:
+            last = high
+        else:
+            return None
+        return first, last
+    
+    @traced
+    def rollup(self, filters):
+        """Aggregates for the filters from cells alone, or None when a row scan is needed"""
+        if self.cells is None:
+            return DashboardAggregates()
+        
+        for key in CUBE_FULL_RANGE_FILTERS:
+            if not self._covers(RANGE_FILTERS[key], *filters[key]):
+                return None
+        age_buckets = self._age_bucket_range(*filters['age'])
+        if age_buckets is None:
+            return None
+        
+        cells = self._flat
+        mask = (
+            cells["Fast_Food_Meals_Per_Week"].between(*filters['fastfood']) &
+            cells["Energy_Level_Score"].between(*filters['energy']) &
+            cells["Age_Bucket"].between(*age_buckets) &
+            cells["Digestive_Issues"].isin(filters['digestive'])
+        )
+        if filters['gender'] != "All":
+            mask &= cells["Gender"] == filters['gender']
+        selected = cells[mask]
+        
+        aggregates = DashboardAggregates()
+        if len(selected) == 0:
+            return aggregates
+        
+        aggregates.count = int(selected["count"].sum())
+        aggregates.sums = pd.Series({column: selected[column + "_sum"].sum() for column in MEAN_COLUMNS})
+        aggregates.sumsq = pd.Series({column: selected[column + "_sumsq"].sum() for column in MEAN_COLUMNS})
+        aggregates.cells = (
+            selected.groupby(CELL_KEYS, observed=True)[["count"] + [column + "_sum" for column in CELL_SUMS]]
+            .sum()
+            .rename(columns={column + "_sum": column for column in CELL_SUMS})
+        )
+        return aggregates
+
+@st.cache_resource(max_entries=1)
+def get_aggregate_cube(_df, dataset_version):
+    """Build the cube once per dataset version, streaming the file when no frame is given"""
+    if _df is None:
+        return AggregateCube.from_chunks(iter_chunks(DATA_PATH))
+    return AggregateCube.from_frame(_df)
+
+def use_streaming(path=DATA_PATH):
+    """Datasets above the threshold are streamed instead of loaded whole"""
+    return os.path.getsize(path) > STREAMING_THRESHOLD_MB * 1024 * 1024
+
+@st.cache_resource(max_entries=1)
+def get_streamed_profile(dataset_version):
+    """Profile of every row of a streamed file, so filter defaults span the file rather than the sample"""
+    return DatasetProfile.from_cube(get_aggregate_cube(None, dataset_version))
+
+@st.cache_resource(max_entries=1)
+def load_sample(dataset_version):
+    """Bounded in-memory sample used by the row-level views of a streamed dataset, shared read-only"""
+    return freeze_frame(stream_sample(DATA_PATH))
+
+@st.cache_data
+def load_streamed_aggregates(dataset_version, filters):
+    """Exact chart aggregates over the whole streamed dataset"""
+    return stream_aggregates(DATA_PATH, filters)
+
+# =============================================================================
+# SQL QUERY ENGINE
+# =============================================================================
+# "pandas" (reference) or "duckdb" (optional: pip install duckdb)
+QUERY_ENGINE = os.getenv("SNACKALYZE_QUERY_ENGINE", "pandas")
+QUERY_ENGINES = ("pandas", "duckdb")
+
+def filters_to_sql(filters):
+    """Parameterized WHERE clause selecting the same rows as apply_filters"""
+    clauses, params = [], []
+    
+    if filters['gender'] != "All":
+        clauses.append('"Gender" = ?')
+        params.append(filters['gender'])
+    
+    for key, column in RANGE_FILTERS.items():
+        low, high = filters[key]
+        if DATA_SCHEMA[column][0].startswith("int"):
+            # Integer bounds select the same rows and spare DuckDB casting the column per row
+            low, high = int(np.ceil(low)), int(np.floor(high))
+        clauses.append(f'"{column}" BETWEEN ? AND ?')
+        params.extend([low, high])
+    
+    if filters['digestive']:
+        clauses.append(f'"Digestive_Issues" IN ({", ".join("?" * len(filters["digestive"]))})')
+        params.extend(filters['digestive'])
+    else:
+        clauses.append("FALSE")
+    
+    return " AND ".join(clauses), params
+
+def risk_score_sql():
+    """SQL expression computing Health_Risk_Score from RISK_RULES, like score_health_risk"""
+    terms = []
+    for column, comparison, thresholds in RISK_RULES:
+        cases = " ".join(f'WHEN "{column}" {comparison} {threshold} THEN {points}' for threshold, points in thresholds)
+        terms.append(f"CASE {cases} ELSE 0 END")
+    return f"LEAST({' + '.join(terms)}, 100)"
+
+class SQLEngine:
+    """DuckDB over a Parquet copy of the dataset, answering chart aggregates with pushed-down queries"""
+    
+    def __init__(self, path):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("SNACKALYZE_QUERY_ENGINE=duckdb needs the duckdb package: pip install duckdb") from e
+        
+        self.path = path
+        # Schema categories become ENUMs, which DuckDB compares far faster than strings
+        enums = ", ".join(
+            f'"{column}"::ENUM({", ".join(repr(str(v)) for v in allowed)}) AS "{column}"'
+            for column, (dtype, allowed) in DATA_SCHEMA.items() if dtype == "category"
+        )
+        self._con = duckdb.connect()
+        # Loaded once into DuckDB's own columnar storage rather than re-reading the Parquet file per query
+        self._con.execute(f"""
+            CREATE TABLE dataset AS
+            SELECT * REPLACE ({enums}),
+                ("Digestive_Issues" = 'Yes')::TINYINT AS "Digestive_Issues_Num",
+                {risk_score_sql()} AS "Health_Risk_Score"
+            FROM read_parquet('{path.replace("'", "''")}')
+        """)
+    
+    def query(self, sql, params=()):
+        # A cursor per query lets sessions on different threads share the engine
+        return self._con.cursor().execute(sql, params).df()
+    
+    @traced
+    def aggregates(self, filters):
+        """DashboardAggregates for the rows matching filters, computed inside DuckDB"""
+        where, params = filters_to_sql(filters)
+        keys = ", ".join(f'"{c}"' for c in CELL_KEYS)
+        summed = MEAN_COLUMNS + [c for c in CELL_SUMS if c not in MEAN_COLUMNS]
+        # One scan: per-cell sums and squares, with the overall totals summed from the cells
+        grouped = self.query(f"""
+            SELECT
+                {keys},
+                COUNT(*)::DOUBLE AS "count",
+                {", ".join(f'SUM("{c}")::DOUBLE AS "sum_{c}"' for c in summed)},
+                {", ".join(f'SUM("{c}"::DOUBLE * "{c}") AS "sumsq_{c}"' for c in MEAN_COLUMNS)}
+            FROM dataset WHERE {where}
+            GROUP BY {keys} ORDER BY {keys}
+        """, params)
+        
+        aggregates = DashboardAggregates()
+        if grouped.empty:
+            return aggregates
+        
+        totals = grouped.sum(numeric_only=True)
+        aggregates.count = int(totals["count"])
+        aggregates.sums = pd.Series([totals[f"sum_{c}"] for c in MEAN_COLUMNS], index=MEAN_COLUMNS)
+        aggregates.sumsq = pd.Series([totals[f"sumsq_{c}"] for c in MEAN_COLUMNS], index=MEAN_COLUMNS)
+        aggregates.cells = grouped.set_index(CELL_KEYS)[["count"]].assign(
+            **{c: grouped[f"sum_{c}"].to_numpy() for c in CELL_SUMS}
+        )
+        return aggregates
+
+def build_parquet(csv_path, parquet_path):
+    """Convert the CSV to Parquet with the schema dtypes, one chunk at a time"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    tmp_path = f"{parquet_path}.{os.getpid()}.tmp"
+    writer = None
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows_for_budget(csv_path)):
+        table = pa.Table.from_pandas(enforce_schema(chunk), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, table.schema)
+        writer.write_table(table.cast(writer.schema))
+    writer.close()
+    os.replace(tmp_path, parquet_path)
+
+@st.cache_resource(max_entries=1)
+def get_sql_engine(dataset_version, path=DATA_PATH, cache_dir=COLUMNAR_CACHE_DIR):
+    """SQL engine over a Parquet copy of the dataset, converted once per dataset version"""
+    if path.endswith(".parquet"):
+        return SQLEngine(path)
+    
+    stem = os.path.splitext(os.path.basename(path))[0]
+    version_tag = hashlib.sha1(dataset_version.encode()).hexdigest()[:12]
+    parquet_path = os.path.join(cache_dir, f"{stem}-{version_tag}.parquet")
+    if not os.path.exists(parquet_path):
+        os.makedirs(cache_dir, exist_ok=True)
+        build_parquet(path, parquet_path)
+        for name in os.listdir(cache_dir):
+            if name.startswith(f"{stem}-") and name.endswith(".parquet") and name != os.path.basename(parquet_path):
+                os.remove(os.path.join(cache_dir, name))
+    return SQLEngine(parquet_path)
+
+def aggregates_difference(expected, actual):
+    """Largest relative difference between two DashboardAggregates (0.0 when they agree)"""
+    if expected.count != actual.count:
+        return float("inf")
+    if expected.count == 0:
+        return 0.0
+    
+    def cells(aggregates):
+        frame = aggregates.cells.reset_index()
+        frame["Fast_Food_Meals_Per_Week"] = frame["Fast_Food_Meals_Per_Week"].astype("int64")
+        frame["Digestive_Issues"] = frame["Digestive_Issues"].astype(str)
+        frame = frame[frame["count"] > 0]
+        return frame.set_index(CELL_KEYS).sort_index()
+    
+    left, right = cells(expected), cells(actual)
+    if not left.index.equals(right.index):
+        return float("inf")
+    
+    pairs = [(expected.sums, actual.sums), (expected.sumsq, actual.sumsq), (left, right)]
+    return max(
+        float((np.abs(a - b) / np.maximum(np.abs(a), 1.0)).to_numpy().max())
+        for a, b in pairs
+    )
+
+# =============================================================================
+# Weighted L1 distance between profiles: feature column -> weight
+NEIGHBOR_WEIGHTS = {
+    "Age": 0.5,
+    "BMI": 2,
+    "Fast_Food_Meals_Per_Week": 1.5,
+    "Sleep_Hours_Per_Day": 1.5,
+    "Physical_Activity_Hours_Per_Week": 1,
+    "Energy_Level_Score": 1,
+}
+
+NEIGHBOR_COUNT = 50
+
+def profile_distance(df, profile):
+    """Weighted L1 distance from every row of df to one profile"""
+    distance = 0
+    for column, weight in NEIGHBOR_WEIGHTS.items():
+        distance = distance + abs(df[column] - profile[column]) * weight
+    return distance
+
+class NeighborIndex:
+    """KD-tree over the weight-scaled profile features for exact nearest-profile queries"""
+    
+    def __init__(self, df):
+        from scipy.spatial import cKDTree
+        
+        self.num_rows = len(df)
+        features = np.column_stack([
+            df[column].to_numpy(dtype="float64") * weight
+            for column, weight in NEIGHBOR_WEIGHTS.items()
+        ]) if self.num_rows else np.empty((0, len(NEIGHBOR_WEIGHTS)))
+        self.tree = cKDTree(features)
+    
+    def scale(self, profile):
+        return np.array([float(profile[column]) * weight for column, weight in NEIGHBOR_WEIGHTS.items()])
+    
+    def candidate_ids(self, profile, k=NEIGHBOR_COUNT):
+        """Row ids within the k-th nearest distance, so ties at the boundary are all included"""
+        k = min(k, self.num_rows)
+        if k == 0:
+            return np.empty(0, dtype=np.intp)
+        point = self.scale(profile)
+        distances, _ = self.tree.query(point, k=k, p=1)
+        radius = float(np.max(distances))
+        # Small slack absorbs rounding differences from the scaled coordinates
+        ids = self.tree.query_ball_point(point, r=radius * (1 + 1e-9) + 1e-9, p=1)
+        return np.sort(np.asarray(ids, dtype=np.intp))
+
+def find_nearest(df, profile, index=None, k=NEIGHBOR_COUNT):
+    """The k rows of df closest to profile, ties broken by row order like a full scan"""
+    if index is None:
+        candidates = df
+    else:
+        candidates = df.take(index.candidate_ids(profile, k))
+    candidates = candidates.assign(distance=profile_distance(candidates, profile))
+    return candidates.nsmallest(k, "distance")
+
+PREDICT_MEMORY_MB = float(os.getenv("SNACKALYZE_PREDICT_MEMORY_MB", "256"))
+
+# Dataset column averaged over a profile's neighbours -> prediction column
+PREDICTED_METRICS = {
+    "Overall_Health_Score": "Predicted_Health_Score",
+    "Doctor_Visits_Per_Year": "Predicted_Doctor_Visits",
+    "Digestive_Issues_Num": "Digestive_Risk_Pct",
+    "Average_Daily_Calories": "Predicted_Daily_Calories",
+}
+
+def neighbor_means_exact(df, points, k, memory_mb):
+    """Average PREDICTED_METRICS over each point's k nearest rows with chunked distance matrices"""
+    features = df[list(NEIGHBOR_WEIGHTS)].to_numpy(dtype="float64")
+    values = df[list(PREDICTED_METRICS)].to_numpy(dtype="float64")
+    weights = list(NEIGHBOR_WEIGHTS.values())
+    # Distance matrix plus the masks built from it
+    chunk = max(1, int(memory_mb * 1024 * 1024 / (len(df) * 8 * 4)))
+    
+    means = np.empty((len(points), len(PREDICTED_METRICS)))
+    for start in range(0, len(points), chunk):
+        block = points[start:start + chunk]
+        distance = 0
+        for j, weight in enumerate(weights):
+            distance = distance + np.abs(features[:, j] - block[:, j, None]) * weight
+        
+        # Keep everything closer than the k-th distance, then fill up with the
+        # earliest rows at exactly that distance, like nsmallest(keep="first")
+        kth = np.partition(distance, k - 1, axis=1)[:, k - 1:k]
+        take = distance < kth
+        at_kth = distance == kth
+        needed = k - take.sum(axis=1, keepdims=True)
+        take |= at_kth & (np.cumsum(at_kth, axis=1) <= needed)
+        
+        means[start:start + chunk] = (take @ values) / k
+    return means
+
+def neighbor_means_indexed(df, points, k, index):
+    """Average PREDICTED_METRICS over each point's k nearest rows using the KD-tree"""
+    weights = np.array(list(NEIGHBOR_WEIGHTS.values()), dtype="float64")
+    values = df[list(PREDICTED_METRICS)].to_numpy(dtype="float64")
+    _, ids = index.tree.query(points * weights, k=k, p=1, workers=-1)
+    return values[np.asarray(ids).reshape(len(points), k)].mean(axis=1)
+
+def incomplete_profiles(profiles):
+    """Boolean mask of profiles with a missing or non-finite feature"""
+    features = profiles[list(NEIGHBOR_WEIGHTS)].to_numpy(dtype="float64")
+    return ~np.isfinite(features).all(axis=1)
+
+@traced
+def predict_profiles(df, profiles, index=None, memory_mb=PREDICT_MEMORY_MB, k=NEIGHBOR_COUNT):
+    """Predict the Personalized Health metrics for every row of a profiles DataFrame; profiles with a
+    missing or non-finite feature get NaN predictions"""
+    missing = [column for column in NEIGHBOR_WEIGHTS if column not in profiles.columns]
+    if missing:
+        raise ValueError(f"Profiles are missing columns: {', '.join(missing)}")
+    
+    results = profiles.copy()
+    # A NaN feature fails every distance comparison, so incomplete profiles are left out
+    incomplete = incomplete_profiles(profiles)
+    k = min(k, len(df))
+    if k == 0 or len(profiles) == 0:
+        for column in PREDICTED_METRICS.values():
+            results[column] = np.nan
+    else:
+        points = profiles[list(NEIGHBOR_WEIGHTS)].to_numpy(dtype="float64")[~incomplete]
+        means = np.full((len(profiles), len(PREDICTED_METRICS)), np.nan)
+        # The scan matches the page exactly; the KD-tree is sub-linear but may pick
+        # different rows among those tied at the k-th distance
+        if len(points) and index is None:
+            means[~incomplete] = neighbor_means_exact(df, points, k, memory_mb)
+        elif len(points):
+            means[~incomplete] = neighbor_means_indexed(df, points, k, index)
+        for j, column in enumerate(PREDICTED_METRICS.values()):
+            results[column] = means[:, j]
+        results["Digestive_Risk_Pct"] = results["Digestive_Risk_Pct"] * 100
+    
+    # Nullable integers keep whole scores while leaving incomplete profiles blank
+    results["Health_Risk_Score"] = pd.array(score_health_risk(profiles), dtype="Int64")
+    results.loc[incomplete, "Health_Risk_Score"] = pd.NA
+    return results
+
+@st.cache_resource(max_entries=1)
+def get_neighbor_index(_df, dataset_version):
+    """Build the nearest-profile index once per dataset version"""
+    return NeighborIndex(_df)
+
+# =============================================================================
+# AI BACKENDS
+# =============================================================================
+AI_BACKEND = os.getenv("SNACKALYZE_AI_BACKEND", "gemini")
+OFFLINE_LATENCY_SECONDS = float(os.getenv("SNACKALYZE_OFFLINE_LATENCY_SECONDS", "1.0"))
+
+class GeminiBackend:
+    """Google Gemini, imported and configured on first use rather than at startup"""
+    
+    def __init__(self, model_name=MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+    
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                import google.generativeai as genai
+                
+                genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+                self._model = genai.GenerativeModel(self.model_name)
+            return self._model
+    
+    @traced
+    def generate(self, prompt):
+        return self._get_model().generate_content(prompt).text
+    
+    def stream(self, prompt):
+        for chunk in self._get_model().generate_content(prompt, stream=True):
+            yield chunk.text
+
+OFFLINE_TIPS = [
+    "🥗 Swap one fast food meal this week for a home-cooked dinner.",
+    "😴 Aim for a consistent bedtime to get closer to 7-8 hours of sleep.",
+    "🏃 Add a brisk 20-minute walk on three days this week.",
+    "💧 Keep a water bottle nearby and refill it twice a day.",
+    "🍎 Pack a piece of fruit to replace your afternoon snack.",
+    "🧘 Take five minutes of stretching after long sitting sessions.",
+]
+
+class OfflineBackend:
+    """Deterministic local stand-in with configurable latency, for load tests and offline use"""
+    
+    def __init__(self, latency_seconds=OFFLINE_LATENCY_SECONDS, pieces=3):
+        self.model_name = "offline-stub"
+        self.latency_seconds = latency_seconds
+        self.pieces = pieces
+    
+    def reply(self, prompt):
+        """Three templated tips, chosen by the prompt so identical prompts get identical replies"""
+        start = int(hashlib.sha256(prompt.encode()).hexdigest(), 16) % len(OFFLINE_TIPS)
+        tips = [OFFLINE_TIPS[(start + i) % len(OFFLINE_TIPS)] for i in range(3)]
+        return "\n".join(f"{i}. {tip}" for i, tip in enumerate(tips, start=1))
+    
+    @traced
+    def generate(self, prompt):
+        time.sleep(self.latency_seconds)
+        return self.reply(prompt)
+    
+    def stream(self, prompt):
+        lines = self.reply(prompt).split("\n")
+        for i, line in enumerate(lines):
+            time.sleep(self.latency_seconds / len(lines))
+            yield line + ("\n" if i < len(lines) - 1 else "")
+
+AI_BACKENDS = {
+    "gemini": GeminiBackend,
+    "offline": OfflineBackend,
+}
+
+@st.cache_resource
+def get_ai_backend(name):
+    """The configured AI backend, created once per server process"""
+    if name not in AI_BACKENDS:
+        raise ValueError(f"Unknown AI backend '{name}', expected one of: {', '.join(AI_BACKENDS)}")
+    return AI_BACKENDS[name]()
+
+# =============================================================================
+# AI RESPONSE CACHE
+# =============================================================================
+AI_CACHE_PATH = os.path.join(COLUMNAR_CACHE_DIR, "ai_responses.sqlite")
+AI_CACHE_TTL_HOURS = float(os.getenv("SNACKALYZE_AI_CACHE_TTL_HOURS", "24"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("SNACKALYZE_AI_CACHE_ENTRIES", "1000"))
+
+def prompt_key(model_name, prompt):
+    """Cache key for a fully rendered prompt sent to a given model"""
+    return hashlib.sha256(f"{model_name}\n{prompt}".encode()).hexdigest()
+
+class ResponseCache:
+    """SQLite-backed store of model responses with a TTL and least-recently-used eviction"""
+    
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT response FROM responses WHERE key = ? AND created >= ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+    
+    def put(self, key, model_name, response):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, response, now, now)
+            )
+            conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            conn.execute("""
+                DELETE FROM responses WHERE key NOT IN (
+                    SELECT key FROM responses ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+    
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+            }
+
+@st.cache_resource
+def get_response_cache():
+    """Response cache shared by all sessions of this server process"""
+    return ResponseCache(AI_CACHE_PATH, AI_CACHE_TTL_HOURS * 3600, AI_CACHE_MAX_ENTRIES)
+
+# =============================================================================
+# AI CALL LIMITS
+# =============================================================================
+AI_TIMEOUT_SECONDS = float(os.getenv("SNACKALYZE_AI_TIMEOUT_SECONDS", "60"))
+# How often a script waiting on a reply checks whether a rerun has interrupted it
+AI_POLL_SECONDS = 0.1
+AI_MAX_WORKERS = int(os.getenv("SNACKALYZE_AI_WORKERS", "8"))
+AI_MAX_CONCURRENT_CALLS = int(os.getenv("SNACKALYZE_AI_MAX_CALLS", "4"))
+AI_CALLS_PER_MINUTE = float(os.getenv("SNACKALYZE_AI_CALLS_PER_MINUTE", "60"))
+
+class InFlightCall:
+    """A model call other sessions can wait on instead of repeating it"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+    
+    def wait(self, timeout):
+        """The shared reply, or None if the call failed or was cancelled"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"no shared reply within {timeout:.0f} seconds")
+        return self.result
+
+class AICallGate:
+    """Shares identical in-flight model calls and caps how many run at once and per minute"""
+    
+    def __init__(self, max_concurrent, calls_per_minute):
+        self.max_concurrent = max_concurrent
+        self.rate = calls_per_minute / 60
+        self.capacity = max(1, max_concurrent)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._tokens = float(self.capacity)
+        self._refilled = time.monotonic()
+        self._flights = {}
+        self._lock = threading.Lock()
+        
+        self.calls = 0
+        self.coalesced = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+    
+    def join(self, key):
+        """The in-flight call for key and whether the caller must make it (leader) or wait on it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = InFlightCall()
+            return flight, True
+    
+    def leave(self, key, flight, result):
+        """Publish the leader's reply (None on failure, so waiters retry) and close the call"""
+        with self._lock:
+            del self._flights[key]
+        flight.result = result
+        flight.done.set()
+    
+    def _take_token(self):
+        """Seconds until the rate limit allows another call, taking the token if it does now"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+    
+    def _acquire(self, deadline):
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            return False
+        while (wait := self._take_token()) > 0:
+            if time.monotonic() + wait > deadline:
+                self._slots.release()
+                return False
+            time.sleep(wait)
+        return True
+    
+    @contextmanager
+    def slot(self, timeout):
+        """Hold one upstream call slot, queueing up to timeout seconds for it"""
+        start = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+        acquired = False
+        try:
+            acquired = self._acquire(start + timeout)
+        finally:
+            waited = time.monotonic() - start
+            with self._lock:
+                self.waiting -= 1
+                if acquired:
+                    self.calls += 1
+                    self.in_flight += 1
+                    self.total_wait += waited
+                    self.max_wait = max(self.max_wait, waited)
+                else:
+                    self.timeouts += 1
+        if not acquired:
+            raise TimeoutError(f"AI service busy, no call slot within {timeout:.0f} seconds")
+        
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+    
+    def call(self, key, fn, timeout):
+        """Return fn()'s reply, sharing it with identical calls and running it under the limits"""
+        while True:
+            flight, leader = self.join(key)
+            if leader:
+                break
+            result = flight.wait(timeout)
+            if result is not None:
+                return result
+        
+        result = None
+        try:
+            with self.slot(timeout):
+                result = fn()
+            return result
+        finally:
+            self.leave(key, flight, result)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'max_waiting': self.max_waiting,
+                'avg_wait_s': self.total_wait / self.calls if self.calls else 0.0,
+                'max_wait_s': self.max_wait,
+                'timeouts': self.timeouts,
+            }
+
+@st.cache_resource
+def get_ai_gate():
+    """Call limits shared by all sessions of this server process"""
+    return AICallGate(AI_MAX_CONCURRENT_CALLS, AI_CALLS_PER_MINUTE)
+
+@traced
+def generate_ai_text(prompt):
+    """Return the model's reply and whether it came from the response cache"""
+    backend = get_ai_backend(AI_BACKEND)
+    cache = get_response_cache()
+    key = prompt_key(backend.model_name, prompt)
+    
+    text = cache.get(key)
+    if text is not None:
+        return text, True
+    
+    def call():
+        text = backend.generate(prompt)
+        cache.put(key, backend.model_name, text)
+        return text
+    
+    return get_ai_gate().call(key, call, AI_TIMEOUT_SECONDS), False
+
+def stream_ai_text(prompt, cancelled, backend, cache, gate):
+    """Yield the model's reply piece by piece, stopping early once cancelled is set"""
+    key = prompt_key(backend.model_name, prompt)
+    
+    text = cache.get(key)
+    if text is not None:
+        yield text
+        return
+    
+    # Another session is already asking the same question: wait for its full reply
+    while True:
+        flight, leader = gate.join(key)
+        if leader:
+            break
+        text = flight.wait(AI_TIMEOUT_SECONDS)
+        if text is not None:
+            yield text
+            return
+    
+    text = None
+    try:
+        pieces = []
+        with gate.slot(AI_TIMEOUT_SECONDS), trace_span("ai_stream", model=backend.model_name):
+            for piece in backend.stream(prompt):
+                if cancelled.is_set():
+                    return
+                pieces.append(piece)
+                yield piece
+        text = "".join(pieces)
+        cache.put(key, backend.model_name, text)
+    finally:
+        gate.leave(key, flight, text)
+
+@st.cache_resource
+def get_ai_executor():
+    """Thread pool shared by all sessions for background model calls"""
+    return ThreadPoolExecutor(max_workers=AI_MAX_WORKERS, thread_name_prefix="snackalyze-ai")
+
+class AIJob:
+    """Model call running on the AI thread pool, handing reply pieces to the script thread"""
+    
+    def __init__(self, prompt, backend, cache, gate, slot=None):
+        self.prompt = prompt
+        self.slot = slot
+        self.backend = backend
+        self.cache = cache
+        self.gate = gate
+        self.pieces = queue.Queue()
+        self.cancelled = threading.Event()
+        self.future = get_ai_executor().submit(self._run)
+    
+    def _run(self):
+        try:
+            for piece in stream_ai_text(self.prompt, self.cancelled, self.backend, self.cache, self.gate):
+                self.pieces.put(piece)
+        except Exception as e:
+            self.pieces.put(e)
+        finally:
+            self.pieces.put(None)
+    
+    def cancel(self):
+        self.cancelled.set()
+    
+    def iter_text(self, timeout):
+        """Yield reply pieces as they arrive; raise TimeoutError after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.cancel()
+                raise TimeoutError(f"no complete reply within {timeout:.0f} seconds")
+            try:
+                piece = self.pieces.get(timeout=min(remaining, AI_POLL_SECONDS))
+            except queue.Empty:
+                # Session state access is a Streamlit interrupt point: a rerun stops the
+                # wait here (and render_ai_stream cancels the job) instead of after a piece
+                st.session_state.get(self.slot)
+                continue
+            if piece is None:
+                return
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+
+def start_ai_job(prompt, slot):
+    """Start a background model call, cancelling the one this session started earlier in slot"""
+    previous = st.session_state.get(slot)
+    if previous is not None:
+        previous.cancel()
+    job = AIJob(prompt, get_ai_backend(AI_BACKEND), get_response_cache(), get_ai_gate(), slot)
+    st.session_state[slot] = job
+    return job
+
+@traced
+def render_ai_stream(placeholder, job, title, timeout=AI_TIMEOUT_SECONDS):
+    """Write a job's reply into placeholder as it streams in"""
+    text = ""
+    try:
+        for piece in job.iter_text(timeout):
+            text += piece
+            placeholder.markdown(f"""
+                <div class="ai-insight">
+                    <h4>{title}</h4>
+                    {text.replace('\n\n', '<br><br>').replace('\n', '<br>')}
+                </div>
+            """, unsafe_allow_html=True)
+    except TimeoutError as e:
+        placeholder.warning(f"⏱️ AI analysis timed out: {str(e)}")
+    except Exception as e:
+        placeholder.error(f"❌ Error generating AI analysis: {str(e)}")
+    finally:
+        # A rerun (e.g. the user changed an input) interrupts the loop above
+        job.cancel()
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+EXPORT_DIR = os.path.join(COLUMNAR_CACHE_DIR, "exports")
+EXPORT_CHUNK_ROWS = int(os.getenv("SNACKALYZE_EXPORT_CHUNK_ROWS", "50000"))
+EXPORT_MAX_FILES = int(os.getenv("SNACKALYZE_EXPORT_FILES", "32"))
+
+# Download format label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "CSV (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+def write_export(df, path, extension, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write df to path chunk by chunk, so the whole file never has to exist in memory"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    
+    if extension == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+        with pq.ParquetWriter(tmp_path, schema) as writer:
+            for start in range(0, len(df), chunk_rows):
+                writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema, preserve_index=False))
+    else:
+        opener = gzip.open if extension == "csv.gz" else open
+        with opener(tmp_path, "wt", newline="") as f:
+            df.iloc[:0].to_csv(f, index=False)
+            for start in range(0, len(df), chunk_rows):
+                df.iloc[start:start + chunk_rows].to_csv(f, index=False, header=False)
+    
+    os.replace(tmp_path, path)
+
+def prune_exports(export_dir, max_files):
+    """Delete all but the max_files most recently used export files"""
+    files = sorted(
+        (os.path.join(export_dir, name) for name in os.listdir(export_dir) if not name.endswith(".tmp")),
+        key=os.path.getmtime,
+        reverse=True
+    )
+    for path in files[max_files:]:
+        try:
+            os.remove(path)
+        except (FileNotFoundError, PermissionError):
+            # Already pruned by another session, or open for a download (Windows)
+            pass
+
+def get_export_file(df, filters, label, dataset_version):
+    """Path of the export of df in the chosen format, written once per dataset version and filters"""
+    extension, _ = EXPORT_FORMATS[label]
+    # Row count guards against a streamed sample and the full frame sharing a dataset version
+    key = hashlib.sha256(repr((dataset_version, normalize_filters(filters), len(df))).encode()).hexdigest()[:16]
+    path = os.path.join(EXPORT_DIR, f"{key}.{extension}")
+    
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    if os.path.exists(path):
+        os.utime(path)
+    else:
+        write_export(df, path, extension)
+        prune_exports(EXPORT_DIR, EXPORT_MAX_FILES)
+    return path
+
+def read_export(df, filters, label, dataset_version, attempts=3):
+    """Contents of the export file, written again if another session prunes it before it is opened"""
+    # Streamlit serves downloads from memory, so the whole file is held here even though writing it was chunked
+    for _ in range(attempts):
+        try:
+            with open(get_export_file(df, filters, label, dataset_version), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            continue
+    raise FileNotFoundError(f"export was pruned {attempts} times before it could be read")
+
+# =============================================================================
+# CHART DOWNSAMPLING
+# =============================================================================
+SCATTER_POINT_BUDGET = int(os.getenv("SNACKALYZE_SCATTER_POINTS", "5000"))
+SCATTER_GRID_BINS = 40
+
+def grid_edges(values, bins):
+    """Histogram edges for a column: one bin per value for integer scores, else bins equal-width bins"""
+    lo, hi = float(values.min()), float(values.max())
+    if pd.api.types.is_integer_dtype(values) and hi - lo < bins:
+        return np.arange(lo - 0.5, hi + 1.5)
+    return np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+
+def grid_cells(df, x, y, bins):
+    """Flat grid cell number of every row over columns x and y"""
+    x_edges, y_edges = grid_edges(df[x], bins), grid_edges(df[y], bins)
+    xi = np.clip(np.searchsorted(x_edges, df[x].to_numpy(), side='right') - 1, 0, len(x_edges) - 2)
+    yi = np.clip(np.searchsorted(y_edges, df[y].to_numpy(), side='right') - 1, 0, len(y_edges) - 2)
+    return xi * (len(y_edges) - 1) + yi
+
+def stratified_sample(df, x, y, budget, bins=SCATTER_GRID_BINS, seed=0):
+    """About budget rows sampled proportionally per x/y grid cell, keeping at least one row from every occupied cell"""
+    if len(df) <= budget:
+        return df
+    cells = pd.Series(grid_cells(df, x, y, bins))
+    # Coarsen the grid until one row per occupied cell fits well within the budget
+    while bins > 1 and cells.nunique() > budget // 2:
+        bins //= 2
+        cells = pd.Series(grid_cells(df, x, y, bins))
+    order = pd.Series(np.random.default_rng(seed).random(len(df))).groupby(cells).rank(method='first')
+    quota = np.maximum(1, np.round(cells.map(cells.value_counts()) * budget / len(df)))
+    return df[(order <= quota).to_numpy()]
+
+def density_grid(df, x, y, bins=SCATTER_GRID_BINS):
+    """Row counts on an x/y grid: (x bin centres, y bin centres, counts indexed [y, x])"""
+    x_edges, y_edges = grid_edges(df[x], bins), grid_edges(df[y], bins)
+    counts, _, _ = np.histogram2d(df[x], df[y], bins=[x_edges, y_edges])
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+def figure_payload_bytes(fig):
+    """Size of the JSON Plotly sends to the browser for fig"""
+    return len(fig.to_json().encode())
+
+# =============================================================================
+# FIGURE CACHE
+# =============================================================================
+FIGURE_CACHE_MAX_ENTRIES = int(os.getenv("SNACKALYZE_FIGURE_CACHE_ENTRIES", "256"))
+FIGURE_CACHE_MAX_MB = float(os.getenv("SNACKALYZE_FIGURE_CACHE_MB", "64"))
+
+class FigureCache:
+    """Serialized Plotly figures keyed by chart id and inputs, with hit counts per chart"""
+    
+    def __init__(self, max_entries, max_bytes):
+        self.entries = LRUCache(max_entries, max_bytes, sizeof=len)
+        self.charts = {}
+        self._lock = threading.Lock()
+    
+    def figure(self, chart_id, key, build, payload=False):
+        """The chart for key, restored from its cached JSON or made by build() and cached (with payload, also the JSON's size)"""
+        import plotly.io as pio
+        
+        text = self.entries.get((chart_id, key))
+        with self._lock:
+            counts = self.charts.setdefault(chart_id, {'hits': 0, 'misses': 0})
+            counts['misses' if text is None else 'hits'] += 1
+        
+        if text is not None:
+            fig = pio.from_json(text)
+        else:
+            with trace_span("build_figure", chart=chart_id):
+                fig = build()
+            text = fig.to_json()
+            self.entries.put((chart_id, key), text)
+        return (fig, len(text.encode())) if payload else fig
+    
+    def stats(self):
+        stats = self.entries.stats()
+        with self._lock:
+            stats['charts'] = {
+                chart: {**counts, 'hit_rate': counts['hits'] / (counts['hits'] + counts['misses'])}
+                for chart, counts in self.charts.items()
+            }
+        return stats
+
+@st.cache_resource(max_entries=1)
+def get_figure_cache(dataset_version):
+    """Figure cache shared by all sessions for one dataset version"""
+    return FigureCache(FIGURE_CACHE_MAX_ENTRIES, int(FIGURE_CACHE_MAX_MB * 1024 * 1024))
+
+def cached_figure(figures, chart_id, key, build, payload=False):
+    """build() through the figure cache, or directly when there is none (with payload, also its JSON size)"""
+    with trace_span("cached_figure", chart=chart_id):
+        if figures is not None:
+            return figures.figure(chart_id, key, build, payload)
+        fig = build()
+        return (fig, figure_payload_bytes(fig)) if payload else fig
+
+# =============================================================================
+# FRAGMENT TIMING
+# =============================================================================
+def is_fragment_rerun():
+    """True while Streamlit reruns only fragments rather than the whole script"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def record_section_time(name, seconds):
+    """Add one run of a page section to this session's timing table"""
+    if not TRACE_PANEL:
+        return
+    timings = st.session_state.setdefault("section_timings", {})
+    entry = timings.setdefault(name, {'full_runs': 0, 'fragment_runs': 0, 'total_ms': 0.0, 'last_ms': 0.0})
+    entry['fragment_runs' if is_fragment_rerun() else 'full_runs'] += 1
+    entry['total_ms'] += seconds * 1000
+    entry['last_ms'] = seconds * 1000
+
+@contextmanager
+def timed_section(name):
+    start = time.perf_counter()
+    try:
+        with trace_span(name):
+            yield
+    finally:
+        record_section_time(name, time.perf_counter() - start)
+
+def timed_fragment(name):
+    """Run the decorated section as an st.fragment, so its own widgets rerun only it, and time every run"""
+    def decorate(func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with timed_section(name):
+                return func(*args, **kwargs)
+        return st.fragment(timed)
+    return decorate
+
+def render_section_timings():
+    """Per-section run counts and times for this session"""
+    if not TRACE_PANEL:
+        return
+    timings = st.session_state.get("section_timings")
+    if not timings:
+        return
+    
+    with st.expander("⏱️ Rerun Timing"):
+        st.caption("Widgets inside a section rerun only that section (fragment reruns); "
+                   "everything else reruns the whole app. Fragment reruns show here after the next full run.")
+        table = pd.DataFrame.from_dict(timings, orient='index')
+        table['mean_ms'] = table['total_ms'] / (table['full_runs'] + table['fragment_runs'])
+        st.dataframe(
+            table[['full_runs', 'fragment_runs', 'last_ms', 'mean_ms']].round(1).rename(columns={
+                'full_runs': 'Full runs', 'fragment_runs': 'Fragment reruns',
+                'last_ms': 'Last (ms)', 'mean_ms': 'Mean (ms)'
+            }),
+            width="stretch"
+        )
+
+def render_trace_panel():
+    """Per-stage breakdown of this run and stage totals for the server process"""
+    run = current_trace()
+    if not TRACE_PANEL or run is None:
+        return
+    
+    run_ms = (time.perf_counter() - run.started) * 1000
+    rows = []
+    
+    def walk(span, depth):
+        for child in span.children:
+            detail = ", ".join(f"{k}={v}" for k, v in child.attributes.items())
+            rows.append({
+                'Stage': "\u2003" * depth + child.name + (f" ({detail})" if detail else ""),
+                'Time (ms)': round(child.seconds * 1000, 2),
+                '% of run': round(child.seconds * 1000 / run_ms * 100, 1),
+            })
+            walk(child, depth + 1)
+    
+    walk(run, 0)
+    
+    with st.expander("🔬 Performance Trace"):
+        st.caption(f"This run so far: {run_ms:.1f} ms. Nested stages are indented under the stage that called them.")
+        st.dataframe(pd.DataFrame(rows), width="stretch", hide_index=True)
+        st.caption("All sessions since the server started")
+        totals = pd.DataFrame.from_dict(get_trace_store().stats(), orient='index')
+        st.dataframe(
+            totals.sort_values('total_s', ascending=False).round(2).rename(columns={
+                'count': 'Calls', 'mean_ms': 'Mean (ms)', 'max_ms': 'Max (ms)',
+                'total_s': 'Total (s)', 'errors': 'Errors'
+            }),
+            width="stretch"
+        )
+
 # =============================================================================
 # UI COMPONENTS
 # =============================================================================
+@traced
 def render_navbar():
     """Render the top navbar"""
     st.markdown("""
@@ -266,6 +2205,7 @@ def render_navbar():
         </div>
     """, unsafe_allow_html=True)
 
+@traced
 def render_filter_summary(filters):
     """Display active filters as badges"""
     st.markdown(f"""
@@ -278,6 +2218,7 @@ def render_filter_summary(filters):
         </div>
     """, unsafe_allow_html=True)
 
+@traced
 def render_health_risk_indicator(avg_risk):
     """Display the overall health risk score"""
     if avg_risk < 40:
@@ -297,90 +2238,36 @@ def render_health_risk_indicator(avg_risk):
         <div class="{color_class}" style="
             padding: 2rem;
             border-radius: 15px;
-            text-align: center;
-            font-size: 1.3rem;
-            box-shadow: 0px 4px 12px rgba(0,0,0,0.2);
-            margin: 2rem 0;
-        ">
-            <div style="font-size: 3rem; margin-bottom: 0.5rem;">{emoji}</div>
-            <div style="font-size: 2.5rem; font-weight: bold;">{round(avg_risk, 1)}/100</div>
-            <div style="font-size: 1.2rem; margin-top: 0.5rem;"><b>{level}</b></div>
-        </div>
-    """, unsafe_allow_html=True)
-
-# =============================================================================
-# PAGE COMPONENTS
-# =============================================================================
-def render_dashboard(filtered_df, filters):
-    """Render the main dashboard page"""
-    st.markdown('<h2 class="section-header">📊 Dashboard Overview</h2>', unsafe_allow_html=True)
-    
-    render_filter_summary(filters)
-    
-    if len(filtered_df) == 0:
-        st.warning("⚠️ No data available for the selected filters. Try adjusting them.")
-        return
-    
-    # Calculate health risk
-    filtered_df["Health_Risk_Score"] = filtered_df.apply(calculate_health_risk, axis=1)
-    avg_risk = filtered_df["Health_Risk_Score"].mean()
-    
-    # Top metrics row
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        avg_fastfood = filtered_df["Fast_Food_Meals_Per_Week"].mean()
-        st.markdown(f"""
-            <div class="metric-card">
-                <h3>🍔 Fast Food</h3>
-                <div class="metric-value">{avg_fastfood:.1f}</div>
-                <p style="color: #666; margin: 0;">meals/week</p>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        avg_bmi = filtered_df["BMI"].mean()
-        st.markdown(f"""
-            <div class="metric-card">
-                <h3>⚖️ Average BMI</h3>
-                <div class="metric-value">{avg_bmi:.1f}</div>
-                <p style="color: #666; margin: 0;">body mass index</p>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col3:
-        avg_energy = filtered_df["Energy_Level_Score"].mean()
-        st.markdown(f"""
-            <div class="metric-card">
-                <h3>⚡ Energy Level</h3>
-                <div class="metric-value">{avg_energy:.1f}/10</div>
-                <p style="color: #666; margin: 0;">average score</p>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col4:
-        avg_sleep = filtered_df["Sleep_Hours_Per_Day"].mean()
-        st.markdown(f"""
-            <div class="metric-card">
-                <h3>😴 Sleep</h3>
-                <div class="metric-value">{avg_sleep:.1f}h</div>
-                <p style="color: #666; margin: 0;">per day</p>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    # Health Risk Indicator
-    st.markdown('<h3 class="section-header">🚨 Health Risk Assessment</h3>', unsafe_allow_html=True)
-    render_health_risk_indicator(avg_risk)
-    
-    # Risk message
-    if avg_fastfood > 10 and avg_bmi > 27:
-        risk_msg = "⚠️ High fast food intake and elevated BMI detected. Consider lifestyle changes to reduce health risks."
-    elif (6 <= avg_fastfood <= 10) or (24 <= avg_bmi <= 27):
-        risk_msg = "💡 Moderate health risk detected. Small improvements in diet and activity can make a big difference."
+            text-align: center;
+            font-size: 1.3rem;
+            box-shadow: 0px 4px 12px rgba(0,0,0,0.2);
+            margin: 2rem 0;
+        ">
+            <div style="font-size: 3rem; margin-bottom: 0.5rem;">{emoji}</div>
+            <div style="font-size: 2.5rem; font-weight: bold;">{round(avg_risk, 1)}/100</div>
+            <div style="font-size: 1.2rem; margin-top: 0.5rem;"><b>{level}</b></div>
+        </div>
+    """, unsafe_allow_html=True)
+
+DATA_PAGE_SIZES = [25, 50, 100, 250]
+GRADIENT_COLUMNS = ['BMI', 'Fast_Food_Meals_Per_Week']
+
+def page_window(df, sort_column, descending, page, page_size):
+    """Rows on one page of df, stably sorted by sort_column (None keeps the current order)"""
+    if sort_column is None:
+        positions = np.arange(len(df))
     else:
-        risk_msg = "✅ Great balance! Your current habits look healthy. Keep up the good work!"
-    
-    st.info(risk_msg)
+        positions = df[sort_column].reset_index(drop=True).sort_values(ascending=not descending, kind='stable').index
+    start = (page - 1) * page_size
+    return df.iloc[positions[start:start + page_size]]
+
+# =============================================================================
+# PAGE COMPONENTS
+# =============================================================================
+@timed_fragment("Dashboard: health trends")
+def render_dashboard_trends(aggregates, filter_key, figures=None):
+    """BMI and calorie trend charts"""
+    import plotly.express as px
     
     # Charts section
     st.markdown('<h3 class="section-header">📈 Health Trends</h3>', unsafe_allow_html=True)
@@ -389,74 +2276,126 @@ def render_dashboard(filtered_df, filters):
     
     with col1:
         # BMI vs Fast Food
-        fastfood_bmi = filtered_df.groupby("Fast_Food_Meals_Per_Week")["BMI"].mean().reset_index()
-        fig_bmi = px.line(
-            fastfood_bmi, 
-            x="Fast_Food_Meals_Per_Week", 
-            y="BMI",
-            markers=True, 
-            line_shape="spline",
-            title="📊 BMI vs Fast Food Consumption"
-        )
-        fig_bmi.update_traces(line_color='#667eea', marker=dict(size=8, color='#764ba2'))
-        fig_bmi.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family="Arial", size=12),
-            title_font_size=16
-        )
-        st.plotly_chart(fig_bmi, use_container_width=True)
+        def build_bmi():
+            fastfood_bmi = aggregates.bmi_by_fastfood()
+            fig_bmi = px.line(
+                fastfood_bmi, 
+                x="Fast_Food_Meals_Per_Week", 
+                y="BMI",
+                markers=True, 
+                line_shape="spline",
+                title="📊 BMI vs Fast Food Consumption"
+            )
+            fig_bmi.update_traces(line_color='#667eea', marker=dict(size=8, color='#764ba2'))
+            fig_bmi.update_layout(
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                font=dict(family="Arial", size=12),
+                title_font_size=16
+            )
+            return fig_bmi
+        
+        st.plotly_chart(cached_figure(figures, "bmi_by_fastfood", filter_key, build_bmi), width="stretch")
     
     with col2:
         # Calories vs Fast Food
-        fastfood_cal = filtered_df.groupby("Fast_Food_Meals_Per_Week")["Average_Daily_Calories"].mean().reset_index()
-        fig_cal = px.line(
-            fastfood_cal, 
-            x="Fast_Food_Meals_Per_Week", 
-            y="Average_Daily_Calories",
-            markers=True, 
-            line_shape="spline",
-            title="🔥 Daily Calories vs Fast Food"
-        )
-        fig_cal.update_traces(line_color='#f093fb', marker=dict(size=8, color='#f5576c'))
-        fig_cal.update_layout(
+        def build_calories():
+            fastfood_cal = aggregates.calories_by_fastfood()
+            fig_cal = px.line(
+                fastfood_cal, 
+                x="Fast_Food_Meals_Per_Week", 
+                y="Average_Daily_Calories",
+                markers=True, 
+                line_shape="spline",
+                title="🔥 Daily Calories vs Fast Food"
+            )
+            fig_cal.update_traces(line_color='#f093fb', marker=dict(size=8, color='#f5576c'))
+            fig_cal.update_layout(
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                font=dict(family="Arial", size=12),
+                title_font_size=16
+            )
+            return fig_cal
+        
+        st.plotly_chart(cached_figure(figures, "calories_by_fastfood", filter_key, build_calories), width="stretch")
+
+@timed_fragment("Dashboard: energy & sleep")
+def render_energy_sleep(filtered_df, filter_key, figures=None):
+    """Energy vs sleep scatter; switching between sample and density reruns only this chart"""
+    import plotly.express as px
+    
+    # Energy vs Sleep Scatter
+    st.markdown("### 😴 Energy & Sleep Correlation")
+    over_budget = len(filtered_df) > SCATTER_POINT_BUDGET
+    view = "Points"
+    if over_budget:
+        view = st.radio("Scatter view", ["Sample", "Density"], horizontal=True, key="energy_view",
+                        help=f"More than {SCATTER_POINT_BUDGET:,} rows match the filters, so the chart shows a representative sample or a density grid")
+    
+    def build_energy():
+        if view == "Density":
+            import plotly.graph_objects as go
+            
+            x_centres, y_centres, counts = density_grid(filtered_df, "Sleep_Hours_Per_Day", "Energy_Level_Score")
+            fig_energy = go.Figure(go.Heatmap(
+                x=x_centres, y=y_centres, z=counts, colorscale="Viridis",
+                colorbar=dict(title="People"),
+                hovertemplate="Sleep: %{x:.1f} h<br>Energy: %{y:.0f}<br>People: %{z:,.0f}<extra></extra>"
+            ))
+            fig_energy.update_layout(
+                title="Energy Level vs Sleep Hours (people per cell)",
+                xaxis_title="Sleep_Hours_Per_Day",
+                yaxis_title="Energy_Level_Score"
+            )
+        else:
+            points = stratified_sample(filtered_df, "Sleep_Hours_Per_Day", "Energy_Level_Score", SCATTER_POINT_BUDGET)
+            fig_energy = px.scatter(
+                points, 
+                x="Sleep_Hours_Per_Day", 
+                y="Energy_Level_Score",
+                color="Fast_Food_Meals_Per_Week",
+                size="Physical_Activity_Hours_Per_Week",
+                hover_data=["Age", "Gender", "BMI"],
+                title="Energy Level vs Sleep Hours (sized by physical activity)",
+                color_continuous_scale="Viridis",
+                render_mode="webgl" if over_budget else "auto"
+            )
+        fig_energy.update_layout(
             plot_bgcolor='white',
             paper_bgcolor='white',
             font=dict(family="Arial", size=12),
             title_font_size=16
         )
-        st.plotly_chart(fig_cal, use_container_width=True)
-    
-    # Energy vs Sleep Scatter
-    st.markdown("### 😴 Energy & Sleep Correlation")
-    fig_energy = px.scatter(
-        filtered_df, 
-        x="Sleep_Hours_Per_Day", 
-        y="Energy_Level_Score",
-        color="Fast_Food_Meals_Per_Week",
-        size="Physical_Activity_Hours_Per_Week",
-        hover_data=["Age", "Gender", "BMI"],
-        title="Energy Level vs Sleep Hours (sized by physical activity)",
-        color_continuous_scale="Viridis"
-    )
-    fig_energy.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        font=dict(family="Arial", size=12),
-        title_font_size=16
-    )
-    st.plotly_chart(fig_energy, use_container_width=True)
+        return fig_energy
     
+    fig_energy, payload_bytes = cached_figure(figures, "energy_sleep", (filter_key, view), build_energy, payload=True)
+    if view == "Density":
+        shown = f"all {len(filtered_df):,} rows binned into a grid"
+    else:
+        points = sum(len(trace.x) for trace in fig_energy.data)
+        shown = f"{points:,} of {len(filtered_df):,} points" + (" (stratified sample)" if over_budget else "")
+    st.plotly_chart(fig_energy, width="stretch")
+    st.caption(f"Showing {shown} · chart payload {payload_bytes / 1024:,.0f} KB")
+
+@timed_fragment("Dashboard: AI recommendations")
+def render_dashboard_ai(aggregates):
+    """AI recommendations panel; its button reruns only this section"""
     # AI Insights
     st.markdown('<h3 class="section-header">🧠 AI-Powered Insights</h3>', unsafe_allow_html=True)
     
-    if st.button("🤖 Generate Smart Health Recommendations", use_container_width=True):
+    if st.button("🤖 Generate Smart Health Recommendations", width="stretch"):
+        avg_fastfood = aggregates.mean("Fast_Food_Meals_Per_Week")
+        avg_bmi = aggregates.mean("BMI")
+        avg_energy = aggregates.mean("Energy_Level_Score")
+        avg_sleep = aggregates.mean("Sleep_Hours_Per_Day")
+        avg_risk = aggregates.mean("Health_Risk_Score")
         summary = f"""
         Average fast food meals per week: {round(avg_fastfood, 2)}
         Average BMI: {round(avg_bmi, 2)}
         Average energy level: {round(avg_energy, 2)}
-        Average sleep hours: {round(filtered_df["Sleep_Hours_Per_Day"].mean(), 2)}
-        Average physical activity hours: {round(filtered_df["Physical_Activity_Hours_Per_Week"].mean(), 2)}
+        Average sleep hours: {round(avg_sleep, 2)}
+        Average physical activity hours: {round(aggregates.mean("Physical_Activity_Hours_Per_Week"), 2)}
         Health risk score: {round(avg_risk, 2)}
         """
         
@@ -481,117 +2420,232 @@ Format as:
         
         with st.spinner("🧠 Analyzing health patterns..."):
             try:
-                response = model.generate_content(prompt)
+                text, cached = generate_ai_text(prompt)
                 
                 st.markdown(f"""
                     <div class="ai-insight">
                         <h4>💡 Personalized Recommendations</h4>
-                        {response.text.replace('\n', '<br>')}
+                        {text.replace('\n', '<br>')}
                     </div>
                 """, unsafe_allow_html=True)
                 
-                st.success("✅ AI recommendations generated successfully!")
+                st.success("✅ AI recommendations generated successfully!" + (" (served from cache)" if cached else ""))
             except Exception as e:
                 st.error(f"❌ Error generating insights: {str(e)}")
 
-def render_insights(filtered_df, filters):
-    """Render the health insights page"""
-    st.markdown('<h2 class="section-header">🩺 Health Insights</h2>', unsafe_allow_html=True)
+@traced
+def render_dashboard(filtered_df, filters, aggregates=None, figures=None):
+    """Render the main dashboard page"""
+    st.markdown('<h2 class="section-header">📊 Dashboard Overview</h2>', unsafe_allow_html=True)
     
     render_filter_summary(filters)
+    filter_key = normalize_filters(filters)
     
-    if len(filtered_df) == 0:
+    if aggregates is None:
+        aggregates = DashboardAggregates.from_frame(filtered_df)
+    
+    if aggregates.count == 0:
         st.warning("⚠️ No data available for the selected filters. Try adjusting them.")
         return
     
+    # Health risk is precomputed at load time
+    avg_risk = aggregates.mean("Health_Risk_Score")
+    
+    # Top metrics row
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        avg_fastfood = aggregates.mean("Fast_Food_Meals_Per_Week")
+        st.markdown(f"""
+            <div class="metric-card">
+                <h3>🍔 Fast Food</h3>
+                <div class="metric-value">{avg_fastfood:.1f}</div>
+                <p style="color: #666; margin: 0;">meals/week</p>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        avg_bmi = aggregates.mean("BMI")
+        st.markdown(f"""
+            <div class="metric-card">
+                <h3>⚖️ Average BMI</h3>
+                <div class="metric-value">{avg_bmi:.1f}</div>
+                <p style="color: #666; margin: 0;">body mass index</p>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        avg_energy = aggregates.mean("Energy_Level_Score")
+        st.markdown(f"""
+            <div class="metric-card">
+                <h3>⚡ Energy Level</h3>
+                <div class="metric-value">{avg_energy:.1f}/10</div>
+                <p style="color: #666; margin: 0;">average score</p>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col4:
+        avg_sleep = aggregates.mean("Sleep_Hours_Per_Day")
+        st.markdown(f"""
+            <div class="metric-card">
+                <h3>😴 Sleep</h3>
+                <div class="metric-value">{avg_sleep:.1f}h</div>
+                <p style="color: #666; margin: 0;">per day</p>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    # Health Risk Indicator
+    st.markdown('<h3 class="section-header">🚨 Health Risk Assessment</h3>', unsafe_allow_html=True)
+    render_health_risk_indicator(avg_risk)
+    
+    # Risk message
+    if avg_fastfood > 10 and avg_bmi > 27:
+        risk_msg = "⚠️ High fast food intake and elevated BMI detected. Consider lifestyle changes to reduce health risks."
+    elif (6 <= avg_fastfood <= 10) or (24 <= avg_bmi <= 27):
+        risk_msg = "💡 Moderate health risk detected. Small improvements in diet and activity can make a big difference."
+    else:
+        risk_msg = "✅ Great balance! Your current habits look healthy. Keep up the good work!"
+    
+    st.info(risk_msg)
+    
+    render_dashboard_trends(aggregates, filter_key, figures)
+    render_energy_sleep(filtered_df, filter_key, figures)
+    render_dashboard_ai(aggregates)
+
+@timed_fragment("Insights: digestive health")
+def render_digestive_health(aggregates, filter_key, figures=None):
+    """Digestive issue split and doctor visits"""
+    import plotly.express as px
+    
     col1, col2 = st.columns([1, 1])
     
     with col1:
         # Digestive Issues Distribution
         st.markdown("### 🔬 Digestive Health Analysis")
-        pie_data = filtered_df["Digestive_Issues"].value_counts()
-        fig_pie = px.pie(
-            names=pie_data.index, 
-            values=pie_data.values,
-            title="Digestive Issues Distribution",
-            color_discrete_sequence=["#667eea", "#764ba2"],
-            hole=0.4
-        )
-        fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-        fig_pie.update_layout(
-            font=dict(family="Arial", size=12),
-            title_font_size=16
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        pie_data = aggregates.digestive_counts()
+        
+        def build_pie():
+            fig_pie = px.pie(
+                names=pie_data.index, 
+                values=pie_data.values,
+                title="Digestive Issues Distribution",
+                color_discrete_sequence=["#667eea", "#764ba2"],
+                hole=0.4
+            )
+            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+            fig_pie.update_layout(
+                font=dict(family="Arial", size=12),
+                title_font_size=16
+            )
+            return fig_pie
+        
+        st.plotly_chart(cached_figure(figures, "digestive_pie", filter_key, build_pie), width="stretch")
         
         # Stats
-        digestive_pct = (filtered_df["Digestive_Issues"] == "Yes").sum() / len(filtered_df) * 100
+        digestive_pct = pie_data.get("Yes", 0) / aggregates.count * 100
         st.markdown(f"""
             <div class="info-box">
                 <h4 style="margin-top: 0;">📊 Quick Stats</h4>
                 <p><b>{digestive_pct:.1f}%</b> of people experience digestive issues</p>
-                <p><b>{len(filtered_df)}</b> total records analyzed</p>
+                <p><b>{aggregates.count}</b> total records analyzed</p>
             </div>
         """, unsafe_allow_html=True)
     
     with col2:
         # Doctor Visits
         st.markdown("### 🏥 Healthcare Utilization")
-        digestive_visits = filtered_df.groupby("Digestive_Issues")["Doctor_Visits_Per_Year"].mean().reset_index()
-        fig_bar = px.bar(
-            digestive_visits, 
-            x="Digestive_Issues", 
-            y="Doctor_Visits_Per_Year",
-            color="Doctor_Visits_Per_Year",
-            color_continuous_scale="Blues",
-            title="Average Doctor Visits by Digestive Issues",
-            labels={"Doctor_Visits_Per_Year": "Doctor Visits/Year"}
-        )
-        fig_bar.update_layout(
-            plot_bgcolor='white',
-            paper_bgcolor='white',
-            font=dict(family="Arial", size=12),
-            title_font_size=16,
-            showlegend=False
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        def build_visits():
+            digestive_visits = aggregates.doctor_visits_by_digestive()
+            fig_bar = px.bar(
+                digestive_visits, 
+                x="Digestive_Issues", 
+                y="Doctor_Visits_Per_Year",
+                color="Doctor_Visits_Per_Year",
+                color_continuous_scale="Blues",
+                title="Average Doctor Visits by Digestive Issues",
+                labels={"Doctor_Visits_Per_Year": "Doctor Visits/Year"}
+            )
+            fig_bar.update_layout(
+                plot_bgcolor='white',
+                paper_bgcolor='white',
+                font=dict(family="Arial", size=12),
+                title_font_size=16,
+                showlegend=False
+            )
+            return fig_bar
+        
+        st.plotly_chart(cached_figure(figures, "doctor_visits", filter_key, build_visits), width="stretch")
         
         # Overall Health Score
-        avg_health = filtered_df["Overall_Health_Score"].mean()
+        avg_health = aggregates.mean("Overall_Health_Score")
         st.markdown(f"""
             <div class="metric-card" style="text-align: center;">
                 <h3>🎯 Overall Health Score</h3>
                 <div class="metric-value" style="font-size: 3rem;">{avg_health:.1f}/10</div>
             </div>
         """, unsafe_allow_html=True)
+
+@timed_fragment("Insights: correlation")
+def render_fastfood_digestive(aggregates, filter_key, figures=None):
+    """Fast food vs digestive issues chart"""
+    import plotly.express as px
     
     # Correlation Analysis
     st.markdown('<h3 class="section-header">🔍 Correlation Analysis</h3>', unsafe_allow_html=True)
     
     # Fast Food vs Digestive Issues
-    ff_digestive = filtered_df.groupby(["Fast_Food_Meals_Per_Week", "Digestive_Issues"]).size().reset_index(name='count')
-    fig_ff = px.bar(
-        ff_digestive,
-        x="Fast_Food_Meals_Per_Week",
-        y="count",
-        color="Digestive_Issues",
-        title="Fast Food Consumption vs Digestive Issues",
-        barmode='group',
-        color_discrete_sequence=["#667eea", "#f5576c"]
-    )
-    fig_ff.update_layout(
-        plot_bgcolor='white',
-        paper_bgcolor='white',
-        font=dict(family="Arial", size=12),
-        title_font_size=16
-    )
-    st.plotly_chart(fig_ff, use_container_width=True)
+    def build_fastfood_digestive():
+        ff_digestive = aggregates.fastfood_digestive_counts()
+        fig_ff = px.bar(
+            ff_digestive,
+            x="Fast_Food_Meals_Per_Week",
+            y="count",
+            color="Digestive_Issues",
+            title="Fast Food Consumption vs Digestive Issues",
+            barmode='group',
+            color_discrete_sequence=["#667eea", "#f5576c"]
+        )
+        fig_ff.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            font=dict(family="Arial", size=12),
+            title_font_size=16
+        )
+        return fig_ff
+    
+    st.plotly_chart(cached_figure(figures, "fastfood_digestive", filter_key, build_fastfood_digestive), width="stretch")
+
+@traced
+def render_insights(filtered_df, filters, aggregates=None, figures=None):
+    """Render the health insights page"""
+    st.markdown('<h2 class="section-header">🩺 Health Insights</h2>', unsafe_allow_html=True)
+    
+    render_filter_summary(filters)
+    filter_key = normalize_filters(filters)
+    
+    if aggregates is None:
+        aggregates = DashboardAggregates.from_frame(filtered_df)
+    
+    if aggregates.count == 0:
+        st.warning("⚠️ No data available for the selected filters. Try adjusting them.")
+        return
+    
+    render_digestive_health(aggregates, filter_key, figures)
+    render_fastfood_digestive(aggregates, filter_key, figures)
 
-def render_personalized_health(df):
+@traced
+def render_personalized_health(df, neighbor_index=None, figures=None, profile=None):
     """Render the personalized health predictor page"""
     st.markdown('<h2 class="section-header">🧍 Personalized Health Predictor</h2>', unsafe_allow_html=True)
     st.write("Enter your personal health metrics to get customized insights based on real data.")
     
+    render_predictor(df, neighbor_index, figures, profile)
+
+@timed_fragment("Personalized Health: predictor")
+def render_predictor(df, neighbor_index=None, figures=None, profile=None):
+    """Predictor form, prediction and AI report; its inputs and button rerun only this section"""
+    import plotly.graph_objects as go
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -609,20 +2663,18 @@ def render_personalized_health(df):
     
     st.markdown("---")
     
-    if st.button("🔮 Predict My Health Profile", use_container_width=True, type="primary"):
+    if st.button("🔮 Predict My Health Profile", width="stretch", type="primary"):
         with st.spinner("🔍 Analyzing your lifestyle against thousands of data points..."):
             # Find similar profiles
-            df_copy = df.copy()
-            df_copy["distance"] = (
-                abs(df_copy["Age"] - age) * 0.5 +
-                abs(df_copy["BMI"] - bmi) * 2 +
-                abs(df_copy["Fast_Food_Meals_Per_Week"] - fast_food) * 1.5 +
-                abs(df_copy["Sleep_Hours_Per_Day"] - sleep) * 1.5 +
-                abs(df_copy["Physical_Activity_Hours_Per_Week"] - activity) * 1 +
-                abs(df_copy["Energy_Level_Score"] - energy) * 1
-            )
-            
-            nearest = df_copy.nsmallest(50, "distance")
+            user_profile = {
+                "Age": age,
+                "BMI": bmi,
+                "Fast_Food_Meals_Per_Week": fast_food,
+                "Sleep_Hours_Per_Day": sleep,
+                "Physical_Activity_Hours_Per_Week": activity,
+                "Energy_Level_Score": energy
+            }
+            nearest = find_nearest(df, user_profile, neighbor_index)
             
             # Calculate predictions
             avg_health = nearest["Overall_Health_Score"].mean()
@@ -709,47 +2761,104 @@ Provide:
 Format professionally and encouragingly.
 """
             
-            try:
-                response = model.generate_content(ai_prompt)
-                st.markdown(f"""
-                    <div class="ai-insight">
-                        <h4>💡 Your Personalized Health Report</h4>
-                        {response.text.replace('\n\n', '<br><br>').replace('\n', '<br>')}
-                    </div>
-                """, unsafe_allow_html=True)
-            except Exception as e:
-                st.error(f"❌ Error generating AI analysis: {str(e)}")
+            # The reply streams into this placeholder once the chart below is drawn
+            ai_placeholder = st.empty()
+            ai_placeholder.info("🧠 Writing your personalized analysis...")
+            ai_job = start_ai_job(ai_prompt, "personal_ai_job")
             
             # Comparison chart
             st.markdown("### 📊 How You Compare")
-            comparison_data = pd.DataFrame({
-                'Metric': ['Health Score', 'BMI', 'Fast Food', 'Sleep', 'Activity', 'Energy'],
-                'Your Value': [avg_health, bmi, fast_food, sleep, activity, energy],
-                'Average': [
-                    df['Overall_Health_Score'].mean(),
-                    df['BMI'].mean(),
-                    df['Fast_Food_Meals_Per_Week'].mean(),
-                    df['Sleep_Hours_Per_Day'].mean(),
-                    df['Physical_Activity_Hours_Per_Week'].mean(),
-                    df['Energy_Level_Score'].mean()
-                ]
-            })
+            your_values = [avg_health, bmi, fast_food, sleep, activity, energy]
             
-            fig_compare = go.Figure()
-            fig_compare.add_trace(go.Bar(name='You', x=comparison_data['Metric'], y=comparison_data['Your Value'], marker_color='#667eea'))
-            fig_compare.add_trace(go.Bar(name='Average', x=comparison_data['Metric'], y=comparison_data['Average'], marker_color='#c7d2fe'))
-            fig_compare.update_layout(
-                barmode='group',
-                title="Your Metrics vs Population Average",
-                plot_bgcolor='white',
-                paper_bgcolor='white',
-                font=dict(family="Arial", size=12),
-                title_font_size=16
-            )
-            st.plotly_chart(fig_compare, use_container_width=True)
+            def build_compare():
+                baseline = profile or DatasetProfile.from_frame(df)
+                comparison_data = pd.DataFrame({
+                    'Metric': ['Health Score', 'BMI', 'Fast Food', 'Sleep', 'Activity', 'Energy'],
+                    'Your Value': your_values,
+                    'Average': [
+                        baseline.mean('Overall_Health_Score'),
+                        baseline.mean('BMI'),
+                        baseline.mean('Fast_Food_Meals_Per_Week'),
+                        baseline.mean('Sleep_Hours_Per_Day'),
+                        baseline.mean('Physical_Activity_Hours_Per_Week'),
+                        baseline.mean('Energy_Level_Score')
+                    ]
+                })
+                
+                fig_compare = go.Figure()
+                fig_compare.add_trace(go.Bar(name='You', x=comparison_data['Metric'], y=comparison_data['Your Value'], marker_color='#667eea'))
+                fig_compare.add_trace(go.Bar(name='Average', x=comparison_data['Metric'], y=comparison_data['Average'], marker_color='#c7d2fe'))
+                fig_compare.update_layout(
+                    barmode='group',
+                    title="Your Metrics vs Population Average",
+                    plot_bgcolor='white',
+                    paper_bgcolor='white',
+                    font=dict(family="Arial", size=12),
+                    title_font_size=16
+                )
+                return fig_compare
+            
+            compare_key = tuple(round(float(value), 6) for value in your_values)
+            st.plotly_chart(cached_figure(figures, "health_comparison", compare_key, build_compare), width="stretch")
+        
+        render_ai_stream(ai_placeholder, ai_job, "💡 Your Personalized Health Report")
+
+@timed_fragment("Data: table")
+def render_data_table(filtered_df, dataset_profile):
+    """Sorted, paginated table; its controls rerun only this section"""
+    # Data table: only the visible page is sorted out, styled and sent to the browser
+    st.markdown("### 📋 Filtered Data")
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    
+    with col1:
+        sort_column = st.selectbox("Sort by", ["Dataset order"] + list(filtered_df.columns), key="data_sort")
+    with col2:
+        order = st.selectbox("Order", ["Ascending", "Descending"], key="data_order")
+    with col3:
+        page_size = st.selectbox("Rows per page", DATA_PAGE_SIZES, index=1, key="data_page_size")
+    
+    page_count = max(1, -(-len(filtered_df) // page_size))
+    # Filters or page size may have changed since the page number was picked
+    if st.session_state.get("data_page", 1) > page_count:
+        st.session_state["data_page"] = page_count
+    with col4:
+        page = st.number_input("Page", min_value=1, max_value=page_count, step=1, key="data_page")
+    
+    window = page_window(
+        filtered_df,
+        None if sort_column == "Dataset order" else sort_column,
+        order == "Descending",
+        page,
+        page_size
+    )
+    styled = window.style
+    for col in GRADIENT_COLUMNS:
+        # Dataset-wide range, so a value has the same shade on every page and under every filter
+        vmin, vmax = dataset_profile.range(col)
+        styled = styled.background_gradient(cmap='Blues', subset=[col], vmin=vmin, vmax=vmax)
+    st.dataframe(styled, width="stretch", height=400)
+    
+    first_row = (page - 1) * page_size + 1
+    st.caption(f"Rows {first_row:,}–{first_row + len(window) - 1:,} of {len(filtered_df):,} · page {page} of {page_count}")
+
+@timed_fragment("Data: export")
+def render_data_export(filtered_df, filters, dataset_version=None, sample=False):
+    """Export format picker and download button; sample labels an export of streamed sample rows"""
+    # Download button: the export is written and read only when the button is clicked
+    export_label = st.radio("Download format", list(EXPORT_FORMATS), horizontal=True, key="export_format")
+    extension, mime = EXPORT_FORMATS[export_label]
+    st.download_button(
+        label=f"⬇️ Download Filtered {'Sample' if sample else 'Data'} ({export_label})",
+        data=lambda: read_export(filtered_df, filters, export_label, dataset_version),
+        file_name=f"snackalyze_filtered_{'sample' if sample else 'data'}.{extension}",
+        mime=mime,
+        width="stretch"
+    )
 
-def render_data_page(filtered_df, filters):
-    """Render the data preview page"""
+@traced
+def render_data_page(filtered_df, filters, figures=None, profile=None, dataset_version=None, filter_cache=None,
+                     total_rows=None):
+    """Render the data preview page; total_rows is the file's row count when filtered_df is a streamed sample"""
     st.markdown('<h2 class="section-header">📊 Dataset Preview</h2>', unsafe_allow_html=True)
     
     render_filter_summary(filters)
@@ -758,35 +2867,33 @@ def render_data_page(filtered_df, filters):
         st.warning("⚠️ No data available for the selected filters. Try adjusting them.")
         return
     
+    # Filtering only removes rows, so a full-length selection is the whole dataset
+    dataset_profile = profile
+    if profile is None or len(filtered_df) != profile.rows:
+        profile = DatasetProfile.from_frame(filtered_df)
+    gender_counts = profile.categories['Gender']
+    
     # Summary statistics
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Total Records", len(filtered_df))
+        if total_rows is None:
+            st.metric("Total Records", profile.rows)
+        else:
+            st.metric("Sample Records", profile.rows)
     with col2:
-        st.metric("Unique Ages", filtered_df["Age"].nunique())
+        st.metric("Unique Ages", int(profile.stat("Age", 'unique')))
     with col3:
-        st.metric("Gender Distribution", f"{(filtered_df['Gender']=='Male').sum()}M / {(filtered_df['Gender']=='Female').sum()}F")
+        st.metric("Gender Distribution", f"{gender_counts.get('Male', 0)}M / {gender_counts.get('Female', 0)}F")
     
-    st.markdown("---")
+    if total_rows is not None:
+        st.info(f"📦 This page shows a random sample of {(dataset_profile or profile).rows:,} of the file's {total_rows:,} rows: "
+                "the table, statistics and download cover only the sampled rows that match the filters.")
     
-    # Data table
-    st.markdown("### 📋 Filtered Data")
-    st.dataframe(
-        filtered_df.style.background_gradient(cmap='Blues', subset=['BMI', 'Fast_Food_Meals_Per_Week']),
-        use_container_width=True,
-        height=400
-    )
+    st.markdown("---")
     
-    # Download button
-    csv = filtered_df.to_csv(index=False)
-    st.download_button(
-        label="⬇️ Download Filtered Data (CSV)",
-        data=csv,
-        file_name="snackalyze_filtered_data.csv",
-        mime="text/csv",
-        use_container_width=True
-    )
+    render_data_table(filtered_df, dataset_profile or profile)
+    render_data_export(filtered_df, filters, dataset_version, sample=total_rows is not None)
     
     # Quick statistics
     st.markdown("### 📈 Quick Statistics")
@@ -794,21 +2901,160 @@ def render_data_page(filtered_df, filters):
     
     with col1:
         st.markdown("**Numerical Summary**")
-        st.dataframe(filtered_df[['Age', 'BMI', 'Fast_Food_Meals_Per_Week', 'Energy_Level_Score']].describe())
+        st.dataframe(profile.describe(['Age', 'BMI', 'Fast_Food_Meals_Per_Week', 'Energy_Level_Score']))
     
     with col2:
         st.markdown("**Categorical Summary**")
         cat_summary = pd.DataFrame({
-            'Gender': filtered_df['Gender'].value_counts(),
-            'Digestive Issues': filtered_df['Digestive_Issues'].value_counts()
+            'Gender': gender_counts,
+            'Digestive Issues': profile.categories['Digestive_Issues']
         })
         st.dataframe(cat_summary)
+    
+    report = load_memory_report()
+    if report is not None:
+        with st.expander("💾 Memory Footprint"):
+            st.caption("Per-column memory of the raw CSV columns vs. the compact schema")
+            st.dataframe(report, width="stretch")
+    
+    if figures is not None:
+        stats = figures.stats()
+        if stats['charts']:
+            with st.expander("⚡ Chart Cache"):
+                st.caption(f"{stats['entries']} cached figures, {stats['bytes'] / 1024:,.0f} KB, shared by all sessions")
+                st.dataframe(pd.DataFrame.from_dict(stats['charts'], orient='index'), width="stretch")
+    
+    if filter_cache is not None:
+        stats = filter_cache.stats()
+        with st.expander("🔎 Filter Cache"):
+            st.caption(f"{stats['entries']} cached filter results, {stats['bytes'] / 1024 / 1024:,.1f} MB, shared by all sessions")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+            col2.metric("Hits", stats['hits'])
+            col3.metric("Misses", stats['misses'])
+    
+    stats = get_response_cache().stats()
+    with st.expander("🤖 AI Response Cache"):
+        st.caption(f"{stats['entries']} cached model replies, reused for identical prompts by all sessions "
+                   f"for {AI_CACHE_TTL_HOURS:g} hours")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Hit Rate", f"{stats['hit_rate']:.0%}")
+        col2.metric("Hits", stats['hits'])
+        col3.metric("Misses", stats['misses'])
+    
+    stats = get_ai_gate().stats()
+    with st.expander("🚦 AI Call Limits"):
+        st.caption(f"At most {AI_MAX_CONCURRENT_CALLS} model calls at once and {AI_CALLS_PER_MINUTE:g} per minute "
+                   f"across all sessions; identical prompts share one call")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Model Calls", stats['calls'])
+        col2.metric("Shared", stats['coalesced'])
+        col3.metric("Timed Out", stats['timeouts'])
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Mean Wait", f"{stats['avg_wait_s']:.2f} s")
+        col2.metric("Longest Wait", f"{stats['max_wait_s']:.2f} s")
+        col3.metric("Most Queued", stats['max_waiting'])
 
 # =============================================================================
 # SIDEBAR
 # =============================================================================
-def render_sidebar(df):
+# "live" applies filter edits as they happen, "submit" stages them until Apply is pressed
+FILTER_MODE = os.getenv("SNACKALYZE_FILTER_MODE", "live")
+FILTER_MODES = ("live", "submit")
+# Live mode waits this long for further edits before filtering (0 disables)
+FILTER_DEBOUNCE_MS = float(os.getenv("SNACKALYZE_FILTER_DEBOUNCE_MS", "300"))
+
+@traced
+def render_filter_widgets(profile):
+    """The sidebar filter widgets, returned as a filters dict"""
+    gender_filter = st.selectbox("👤 Gender", options=["All"] + profile.values("Gender"))
+    
+    age_min, age_max = (int(v) for v in profile.range("Age"))
+    age_range = st.slider(
+        "🎂 Age Range",
+        age_min,
+        age_max,
+        (age_min, age_max)
+    )
+    
+    bmi_min, bmi_max = (float(v) for v in profile.range("BMI"))
+    bmi_range = st.slider(
+        "⚖️ BMI Range",
+        bmi_min,
+        bmi_max,
+        (bmi_min, bmi_max),
+        step=0.1
+    )
+    
+    fastfood_min, fastfood_max = (int(v) for v in profile.range("Fast_Food_Meals_Per_Week"))
+    fastfood_range = st.slider(
+        "🍔 Fast Food (meals/week)",
+        fastfood_min,
+        fastfood_max,
+        (fastfood_min, fastfood_max)
+    )
+    
+    digestive_filter = st.multiselect(
+        "🔬 Digestive Issues",
+        options=["Yes", "No"],
+        default=["Yes", "No"]
+    )
+    
+    energy_min, energy_max = (int(v) for v in profile.range("Energy_Level_Score"))
+    energy_range = st.slider(
+        "⚡ Energy Level",
+        energy_min,
+        energy_max,
+        (energy_min, energy_max)
+    )
+    
+    activity_min, activity_max = (float(v) for v in profile.range("Physical_Activity_Hours_Per_Week"))
+    activity_range = st.slider(
+        "🏃 Physical Activity (hrs/week)",
+        activity_min,
+        activity_max,
+        (activity_min, activity_max),
+        step=0.5
+    )
+    
+    sleep_min, sleep_max = (float(v) for v in profile.range("Sleep_Hours_Per_Day"))
+    sleep_range = st.slider(
+        "😴 Sleep (hrs/day)",
+        sleep_min,
+        sleep_max,
+        (sleep_min, sleep_max),
+        step=0.5
+    )
+    
+    return {
+        'gender': gender_filter,
+        'age': age_range,
+        'bmi': bmi_range,
+        'fastfood': fastfood_range,
+        'digestive': digestive_filter,
+        'energy': energy_range,
+        'activity': activity_range,
+        'sleep': sleep_range
+    }
+
+def debounce_filters(filters, delay_seconds):
+    """Hold a run whose filters just changed until no newer edit arrives for delay_seconds"""
+    key = normalize_filters(filters)
+    # The first run of a session, and runs that leave the filters alone, go straight through
+    if "applied_filters" in st.session_state and st.session_state["applied_filters"] != key and delay_seconds > 0:
+        deadline = time.perf_counter() + delay_seconds
+        while time.perf_counter() < deadline:
+            time.sleep(0.02)
+            # Session state access is a Streamlit interrupt point: a newer edit stops this
+            # run here, before it filters and draws values the user has already moved past
+            st.session_state.get("applied_filters")
+    st.session_state["applied_filters"] = key
+
+@traced
+def render_sidebar(df, profile=None):
     """Render the sidebar with filters"""
+    profile = profile or DatasetProfile.from_frame(df)
+    
     with st.sidebar:
         st.markdown("## 🎛️ Control Panel")
         st.markdown("---")
@@ -818,6 +3064,7 @@ def render_sidebar(df):
         page = st.radio(
             "Select Page",
             ["Dashboard", "Insights", "Personalized Health", "Data"],
+            key="page",
             label_visibility="collapsed"
         )
         
@@ -826,108 +3073,127 @@ def render_sidebar(df):
         # Filters
         st.markdown("### 🔍 Data Filters")
         
-        gender_filter = st.selectbox("👤 Gender", options=["All"] + list(df["Gender"].unique()))
-        
-        age_range = st.slider(
-            "🎂 Age Range",
-            int(df["Age"].min()),
-            int(df["Age"].max()),
-            (int(df["Age"].min()), int(df["Age"].max()))
-        )
-        
-        bmi_range = st.slider(
-            "⚖️ BMI Range",
-            float(df["BMI"].min()),
-            float(df["BMI"].max()),
-            (float(df["BMI"].min()), float(df["BMI"].max())),
-            step=0.1
-        )
-        
-        fastfood_range = st.slider(
-            "🍔 Fast Food (meals/week)",
-            int(df["Fast_Food_Meals_Per_Week"].min()),
-            int(df["Fast_Food_Meals_Per_Week"].max()),
-            (int(df["Fast_Food_Meals_Per_Week"].min()), int(df["Fast_Food_Meals_Per_Week"].max()))
-        )
-        
-        digestive_filter = st.multiselect(
-            "🔬 Digestive Issues",
-            options=["Yes", "No"],
-            default=["Yes", "No"]
-        )
-        
-        energy_range = st.slider(
-            "⚡ Energy Level",
-            int(df["Energy_Level_Score"].min()),
-            int(df["Energy_Level_Score"].max()),
-            (int(df["Energy_Level_Score"].min()), int(df["Energy_Level_Score"].max()))
-        )
-        
-        activity_range = st.slider(
-            "🏃 Physical Activity (hrs/week)",
-            float(df["Physical_Activity_Hours_Per_Week"].min()),
-            float(df["Physical_Activity_Hours_Per_Week"].max()),
-            (float(df["Physical_Activity_Hours_Per_Week"].min()), float(df["Physical_Activity_Hours_Per_Week"].max())),
-            step=0.5
-        )
+        if FILTER_MODE not in FILTER_MODES:
+            raise ValueError(f"Unknown filter mode '{FILTER_MODE}', expected one of: {', '.join(FILTER_MODES)}")
         
-        sleep_range = st.slider(
-            "😴 Sleep (hrs/day)",
-            float(df["Sleep_Hours_Per_Day"].min()),
-            float(df["Sleep_Hours_Per_Day"].max()),
-            (float(df["Sleep_Hours_Per_Day"].min()), float(df["Sleep_Hours_Per_Day"].max())),
-            step=0.5
-        )
+        if FILTER_MODE == "submit":
+            # Widgets in a form send nothing until the form is submitted
+            with st.form("filter_form", border=False):
+                filters = render_filter_widgets(profile)
+                st.form_submit_button("✅ Apply Filters", width="stretch")
+        else:
+            filters = render_filter_widgets(profile)
+            debounce_filters(filters, FILTER_DEBOUNCE_MS / 1000)
         
         st.markdown("---")
         
         # Reset button
-        if st.button("🔄 Reset All Filters", use_container_width=True):
+        if st.button("🔄 Reset All Filters", width="stretch"):
             st.rerun()
         
         st.markdown("---")
         st.markdown("### ℹ️ About")
         st.info("**Snackalyze** helps you understand the relationship between fast food consumption and health metrics.")
         
-        filters = {
-            'gender': gender_filter,
-            'age': age_range,
-            'bmi': bmi_range,
-            'fastfood': fastfood_range,
-            'digestive': digestive_filter,
-            'energy': energy_range,
-            'activity': activity_range,
-            'sleep': sleep_range
-        }
-        
         return page, filters
 
+# =============================================================================
+# COMMAND LINE
+# =============================================================================
+def run_cli(argv):
+    """Batch tools that run without the Streamlit server, e.g. `python app.py predict profiles.csv`"""
+    parser = argparse.ArgumentParser(prog="python app.py", description="Snackalyze batch tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    predict = commands.add_parser("predict", help="Predict health metrics for a CSV of profiles")
+    predict.add_argument("profiles", help=f"CSV with columns {', '.join(NEIGHBOR_WEIGHTS)}")
+    predict.add_argument("-o", "--output", default="-", help="Output CSV path (default: stdout)")
+    predict.add_argument("--data", default=DATA_PATH, help="Dataset to compare profiles against")
+    predict.add_argument("--use-index", action="store_true", help="Use the KD-tree (faster on large datasets, ties may differ)")
+    predict.add_argument("--memory-mb", type=float, default=PREDICT_MEMORY_MB, help="Memory budget per distance chunk")
+    
+    args = parser.parse_args(argv)
+    
+    df = add_derived_columns(read_columnar(args.data))
+    profiles = pd.read_csv(args.profiles)
+    index = NeighborIndex(df) if args.use_index else None
+    
+    try:
+        results = predict_profiles(df, profiles, index, args.memory_mb)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    incomplete = np.flatnonzero(incomplete_profiles(profiles))
+    if len(incomplete):
+        # Rows as numbered in the CSV, counting the header as line 1
+        lines = ", ".join(str(i + 2) for i in incomplete[:20]) + (", ..." if len(incomplete) > 20 else "")
+        print(f"warning: {len(incomplete)} profile(s) with missing features have no prediction (lines {lines})",
+              file=sys.stderr)
+    
+    results.to_csv(sys.stdout if args.output == "-" else args.output, index=False)
+    return 0
+
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
+@traced
 def main():
     """Main application entry point"""
+    run_start = time.perf_counter()
     load_custom_css()
     render_navbar()
     
-    # Load data
-    df = load_data()
+    # Load data (large files are streamed and row-level views use a sample)
+    dataset_version = get_dataset_version()
+    streaming = use_streaming()
+    with trace_span("load_data", streaming=streaming):
+        df = load_sample(dataset_version) if streaming else load_data(dataset_version)
+    
+    # Per-column statistics shared by the sidebar, comparison chart and Data page
+    profile = get_dataset_profile(df, dataset_version)
     
-    # Sidebar
-    page, filters = render_sidebar(df)
+    # Sidebar (a sample's ranges would make untouched filters drop the rows it missed)
+    filter_profile = get_streamed_profile(dataset_version) if streaming else profile
+    page, filters = render_sidebar(df, filter_profile)
     
     # Apply filters
-    filtered_df = apply_filters(df, filters)
+    filter_index = get_filter_index(df, dataset_version)
+    filter_cache = get_filter_cache(dataset_version)
+    filtered_df = cached_apply_filters(df, filters, filter_index, filter_cache)
+    
+    if streaming:
+        st.caption(f"📦 Large dataset: charts summarize every row, row-level views use a random sample of {len(df):,} rows.")
+    
+    # Chart aggregates come from the cube when the filters line up with its cells,
+    # otherwise from a scan (the streamed file, or the filtered rows in memory)
+    if QUERY_ENGINE not in QUERY_ENGINES:
+        raise ValueError(f"Unknown query engine '{QUERY_ENGINE}', expected one of: {', '.join(QUERY_ENGINES)}")
+    
+    aggregates = None
+    if page in ("Dashboard", "Insights"):
+        cube = get_aggregate_cube(None if streaming else df, dataset_version)
+        aggregates = cube.rollup(filters)
+        # Filters the cube cannot answer go to the SQL engine when enabled, else a row scan
+        if aggregates is None and QUERY_ENGINE == "duckdb":
+            aggregates = get_sql_engine(dataset_version).aggregates(filters)
+        elif aggregates is None and streaming:
+            aggregates = load_streamed_aggregates(dataset_version, filters)
     
     # Render selected page
+    figures = get_figure_cache(dataset_version)
     if page == "Dashboard":
-        render_dashboard(filtered_df, filters)
+        render_dashboard(filtered_df, filters, aggregates, figures)
     elif page == "Insights":
-        render_insights(filtered_df, filters)
+        render_insights(filtered_df, filters, aggregates, figures)
     elif page == "Personalized Health":
-        render_personalized_health(df)
+        render_personalized_health(df, get_neighbor_index(df, dataset_version), figures, profile)
     else:  # Data
-        render_data_page(filtered_df, filters)
+        render_data_page(filtered_df, filters, figures, profile, dataset_version, filter_cache,
+                         filter_profile.rows if streaming else None)
+    
+    record_section_time("Whole app", time.perf_counter() - run_start)
+    render_section_timings()
+    render_trace_panel()
     
     # Footer
     st.markdown("---")
@@ -939,4 +3205,6 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ("predict",):
+        sys.exit(run_cli(sys.argv[1:]))
     main()
\ No newline at end of file
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Tests import the app module directly, outside `streamlit run`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    """The bundled dataset as load_data serves it: schema enforced, derived columns added, read-only"""
+    return app.freeze_frame(app.add_derived_columns(app.enforce_schema(pd.read_csv(app.DATA_PATH))))
+
+
+def default_filters(profile):
+    """The filters of an untouched sidebar"""
+    filters = {key: tuple(profile.range(column)) for key, column in app.RANGE_FILTERS.items()}
+    filters['gender'] = "All"
+    filters['digestive'] = ["Yes", "No"]
+    return filters
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+def run_threads(targets):
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_identical_calls_share_one_upstream_call():
+    gate = app.AICallGate(4, 0)
+    upstream, results = [], []
+    
+    def fn():
+        upstream.append(1)
+        time.sleep(0.2)
+        return "reply"
+    
+    run_threads([lambda: results.append(gate.call("key", fn, timeout=5))] * 8)
+    
+    assert len(upstream) == 1
+    assert results == ["reply"] * 8
+    assert gate.stats()['calls'] == 1
+    assert gate.stats()['coalesced'] == 7
+
+
+def test_waiter_retries_when_the_leader_fails():
+    gate = app.AICallGate(2, 0)
+    leader_started = threading.Event()
+    attempts = []
+    
+    def failing():
+        attempts.append("leader")
+        leader_started.set()
+        time.sleep(0.2)
+        raise RuntimeError("upstream error")
+    
+    def leader():
+        with pytest.raises(RuntimeError):
+            gate.call("key", failing, timeout=5)
+    
+    thread = threading.Thread(target=leader)
+    thread.start()
+    leader_started.wait(5)
+    
+    def succeeding():
+        attempts.append("waiter")
+        return "reply"
+    
+    assert gate.call("key", succeeding, timeout=5) == "reply"
+    thread.join()
+    assert attempts == ["leader", "waiter"]
+    assert gate.stats()['coalesced'] == 1
+
+
+def test_in_flight_calls_never_exceed_the_limit():
+    gate = app.AICallGate(3, 0)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+    
+    def fn():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return "reply"
+    
+    run_threads([lambda key=key: gate.call(key, fn, timeout=10) for key in range(12)])
+    
+    assert peak[0] == 3
+    assert gate.stats()['calls'] == 12
+    assert gate.stats()['in_flight'] == 0
+
+
+def test_slot_wait_past_the_deadline_times_out():
+    gate = app.AICallGate(1, 0)
+    release = threading.Event()
+    holder = threading.Thread(target=lambda: gate.call("first", lambda: release.wait(5) and "reply", timeout=5))
+    holder.start()
+    while gate.stats()['in_flight'] == 0:
+        time.sleep(0.01)
+    
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        gate.call("second", lambda: "reply", timeout=0.2)
+    assert time.monotonic() - start < 1
+    
+    release.set()
+    holder.join()
+    assert gate.stats()['timeouts'] == 1
+    assert gate.stats()['calls'] == 1
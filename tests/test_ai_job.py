@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+import app
+
+
+class RerunRequested(Exception):
+    pass
+
+
+class InterruptingSessionState:
+    """Stands in for st.session_state in a run that Streamlit has been asked to rerun"""
+    
+    def __init__(self):
+        self.reads = 0
+    
+    def get(self, key, default=None):
+        self.reads += 1
+        raise RerunRequested()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return app.ResponseCache(str(tmp_path / "responses.sqlite"), ttl_seconds=3600, max_entries=10)
+
+
+def test_waiting_for_a_slow_reply_yields_to_reruns(monkeypatch, cache):
+    state = InterruptingSessionState()
+    monkeypatch.setattr(app.st, "session_state", state)
+    job = app.AIJob("prompt", app.OfflineBackend(latency_seconds=5), cache, app.AICallGate(1, 0), "slot")
+    
+    start = time.monotonic()
+    with pytest.raises(RerunRequested):
+        next(job.iter_text(timeout=60))
+    job.cancel()
+    
+    assert state.reads == 1
+    assert time.monotonic() - start < 1
+
+
+def test_reply_pieces_arrive_in_order(cache):
+    job = app.AIJob("prompt", app.OfflineBackend(latency_seconds=0.05), cache, app.AICallGate(1, 0), "slot")
+    text = "".join(job.iter_text(timeout=10))
+    assert text == app.OfflineBackend().reply("prompt")
@@ -0,0 +1,28 @@
+import os
+import threading
+
+import pandas as pd
+
+import app
+
+
+def test_concurrent_builds_publish_a_complete_file(tmp_path):
+    csv_path = str(tmp_path / "data.csv")
+    pd.read_csv(app.DATA_PATH).to_csv(csv_path, index=False)
+    feather_path = str(tmp_path / "cache" / "data.feather")
+    manifest_path = str(tmp_path / "cache" / "data.json")
+    digest = app.file_sha256(csv_path)
+    
+    threads = [
+        threading.Thread(target=app.build_columnar, args=(csv_path, feather_path, manifest_path, digest))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert not [name for name in os.listdir(tmp_path / "cache") if name.endswith(".tmp")]
+    df = app.read_columnar(csv_path, cache_dir=str(tmp_path / "cache"))
+    expected = app.enforce_schema(pd.read_csv(csv_path))
+    pd.testing.assert_frame_equal(df, expected)
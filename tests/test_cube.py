@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+import app
+from conftest import default_filters
+
+
+@pytest.fixture(scope="module")
+def cube(dataset):
+    return app.AggregateCube.from_frame(dataset)
+
+
+@pytest.fixture(scope="module")
+def profile(dataset):
+    return app.DatasetProfile.from_frame(dataset)
+
+
+def integer_range(rng, low, high):
+    ends = np.sort(rng.integers(low, high + 1, 2))
+    return float(ends[0]), float(ends[1])
+
+
+def aligned_filters(profile, rng):
+    """Random filters the cube can answer: whole age buckets and full continuous ranges"""
+    filters = default_filters(profile)
+    age_min, age_max = profile.range("Age")
+    starts = np.arange(0, age_max + 1, app.AGE_BUCKET_YEARS)
+    first, last = np.sort(rng.choice(starts, 2))
+    filters['age'] = (float(first), float(last + app.AGE_BUCKET_YEARS - 1))
+    filters['fastfood'] = integer_range(rng, *profile.range("Fast_Food_Meals_Per_Week"))
+    filters['energy'] = integer_range(rng, *profile.range("Energy_Level_Score"))
+    filters['gender'] = rng.choice(["All"] + profile.values("Gender"))
+    filters['digestive'] = [value for value in profile.values("Digestive_Issues") if rng.random() < 0.7]
+    return filters
+
+
+def test_aligned_filters_roll_up_to_the_row_scan(dataset, cube, profile):
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        filters = aligned_filters(profile, rng)
+        aggregates = cube.rollup(filters)
+        assert aggregates is not None, filters
+        expected = app.DashboardAggregates.from_frame(app.apply_filters(dataset, filters))
+        assert app.aggregates_difference(expected, aggregates) < 1e-9, filters
+
+
+@pytest.mark.parametrize("changes", [
+    {'age': (21.0, 33.0)},
+    {'age': (20.0, 33.0)},
+    {'bmi': (22.0, 28.0)},
+    {'activity': (1.0, 5.0)},
+    {'sleep': (6.0, 8.0)},
+])
+def test_filters_that_split_cells_need_a_scan(cube, profile, changes):
+    assert cube.rollup({**default_filters(profile), **changes}) is None
@@ -0,0 +1,73 @@
+import os
+import tracemalloc
+
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import app
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "EXPORT_DIR", str(tmp_path / "exports"))
+    return tmp_path / "exports"
+
+
+@pytest.mark.parametrize("label", list(app.EXPORT_FORMATS))
+def test_exports_round_trip(dataset, tmp_path, label):
+    extension, _ = app.EXPORT_FORMATS[label]
+    path = str(tmp_path / f"export.{extension}")
+    app.write_export(dataset, path, extension, chunk_rows=97)
+    
+    if extension == "parquet":
+        restored = pd.read_parquet(path)
+        pd.testing.assert_frame_equal(restored, dataset.reset_index(drop=True), check_dtype=False, check_categorical=False)
+    else:
+        restored = pd.read_csv(path)
+        pd.testing.assert_frame_equal(restored, pd.read_csv(pd.io.common.StringIO(dataset.to_csv(index=False))))
+
+
+def test_read_export_rewrites_a_file_pruned_by_another_session(dataset, export_dir, monkeypatch):
+    path = app.get_export_file(dataset, {}, "CSV", "v1")
+    expected = open(path, "rb").read()
+    
+    # Another session prunes the file between the existence check and the refresh
+    real_utime = os.utime
+    
+    def pruned_utime(target, *args, **kwargs):
+        monkeypatch.setattr(app.os, "utime", real_utime)
+        os.remove(target)
+        raise FileNotFoundError(target)
+    
+    monkeypatch.setattr(app.os, "utime", pruned_utime)
+    assert app.read_export(dataset, {}, "CSV", "v1") == expected
+
+
+def test_data_page_writes_no_export_until_download(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNACKALYZE_CACHE_DIR", str(tmp_path))
+    at = AppTest.from_file(os.path.join(os.path.dirname(app.__file__), "app.py"), default_timeout=120)
+    at.session_state["page"] = "Data"
+    at.run()
+    
+    assert not at.exception
+    assert not (tmp_path / "exports").exists() or not os.listdir(tmp_path / "exports")
+
+
+def export_peak_bytes(df, path):
+    tracemalloc.start()
+    try:
+        app.write_export(df, path, "csv", chunk_rows=2_000)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_chunked_export_peak_memory_does_not_grow_with_rows(dataset, tmp_path):
+    small = pd.concat([dataset] * (50_000 // len(dataset)), ignore_index=True)
+    large = pd.concat([dataset] * (200_000 // len(dataset)), ignore_index=True)
+    
+    small_peak = export_peak_bytes(small, str(tmp_path / "small.csv"))
+    large_peak = export_peak_bytes(large, str(tmp_path / "large.csv"))
+    # Rendering the CSV whole would grow the peak fourfold along with the rows
+    assert large_peak < small_peak * 1.25, (small_peak, large_peak)
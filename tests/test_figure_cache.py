@@ -0,0 +1,32 @@
+import plotly.graph_objects as go
+
+import app
+
+
+def test_cache_hits_report_payload_without_serializing_again(monkeypatch):
+    figures = app.FigureCache(max_entries=4, max_bytes=10 * 1024 * 1024)
+    builds = []
+    
+    def build():
+        builds.append(1)
+        return go.Figure(go.Scatter(x=list(range(500)), y=list(range(500)), name="Énergie"))
+    
+    fig, payload = app.cached_figure(figures, "chart", "key", build, payload=True)
+    assert payload == app.figure_payload_bytes(fig)
+    
+    serialized = []
+    original = go.Figure.to_json
+    monkeypatch.setattr(go.Figure, "to_json", lambda self, *a, **k: serialized.append(1) or original(self, *a, **k))
+    again, cached_payload = app.cached_figure(figures, "chart", "key", build, payload=True)
+    
+    assert cached_payload == payload
+    assert not serialized
+    assert len(builds) == 1
+    assert len(again.data[0].x) == 500
+    assert figures.stats()['charts']['chart'] == {'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_payload_without_a_cache():
+    fig, payload = app.cached_figure(None, "chart", "key", lambda: go.Figure(go.Bar(y=[1, 2, 3])), payload=True)
+    assert payload == app.figure_payload_bytes(fig)
+    assert isinstance(app.cached_figure(None, "chart", "key", lambda: go.Figure()), go.Figure)
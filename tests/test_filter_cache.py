@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+import app
+from conftest import default_filters
+
+
+@pytest.mark.parametrize("narrowed", [False, True])
+def test_cached_results_refuse_writes(dataset, narrowed):
+    filters = default_filters(app.DatasetProfile.from_frame(dataset))
+    if narrowed:
+        filters['gender'] = "Female"
+    cache = app.LRUCache(max_entries=8)
+    index = app.FilterIndex(dataset)
+    
+    result = app.cached_apply_filters(dataset, filters, index, cache)
+    with pytest.raises(TypeError, match="read-only"):
+        result["Z"] = 1
+    with pytest.raises(ValueError, match="read-only"):
+        result["BMI"].to_numpy()[0] = 0
+    
+    again = app.cached_apply_filters(dataset, filters, index, cache)
+    assert "Z" not in again.columns
+    assert cache.stats()['hits'] == 1
+
+
+def test_cached_results_match_the_reference_filter(dataset):
+    filters = default_filters(app.DatasetProfile.from_frame(dataset))
+    filters['bmi'] = (22.0, 28.0)
+    filters['digestive'] = ["Yes"]
+    cached = app.cached_apply_filters(dataset, filters, app.FilterIndex(dataset), app.LRUCache())
+    reference = app.apply_filters(dataset, filters)
+    pd.testing.assert_frame_equal(pd.DataFrame(cached), pd.DataFrame(reference))
@@ -0,0 +1,70 @@
+import os
+import re
+import time
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import app
+
+
+def filtered_rows(at):
+    """Row count of filtered_df, from the Data page's pagination caption"""
+    caption = next(c.value for c in at.caption if c.value.startswith("Rows "))
+    return int(re.search(r"of ([\d,]+)", caption).group(1).replace(",", ""))
+
+
+def bmi_slider(at):
+    return next(s for s in at.slider if s.label == "⚖️ BMI Range")
+
+
+def test_submit_mode_filters_only_when_applied(monkeypatch):
+    monkeypatch.setenv("SNACKALYZE_FILTER_MODE", "submit")
+    at = AppTest.from_file(os.path.join(os.path.dirname(app.__file__), "app.py"), default_timeout=120)
+    at.session_state["page"] = "Data"
+    at.run()
+    total = filtered_rows(at)
+    
+    # Form widgets stay in the browser until the form is submitted
+    bmi_slider(at).set_value((20.0, 25.0)).run()
+    assert not at.exception
+    assert filtered_rows(at) == total
+    
+    bmi_slider(at).set_value((20.0, 25.0))
+    next(b for b in at.button if b.label == "✅ Apply Filters").click().run()
+    assert not at.exception
+    assert 0 < filtered_rows(at) < total
+
+
+@pytest.fixture
+def session_state(monkeypatch):
+    state = {}
+    monkeypatch.setattr(app.st, "session_state", state)
+    return state
+
+
+def filters_with_bmi(low, high):
+    return {'gender': "All", 'bmi': (low, high), 'digestive': ["Yes", "No"]}
+
+
+def timed_debounce(filters, delay_seconds):
+    start = time.perf_counter()
+    app.debounce_filters(filters, delay_seconds)
+    return time.perf_counter() - start
+
+
+def test_debounce_skips_runs_that_leave_filters_alone(session_state):
+    filters = filters_with_bmi(18.0, 35.0)
+    session_state["applied_filters"] = app.normalize_filters(filters)
+    assert timed_debounce(filters, 5) < 0.1
+
+
+def test_debounce_is_off_at_zero_delay(session_state):
+    session_state["applied_filters"] = app.normalize_filters(filters_with_bmi(18.0, 35.0))
+    assert timed_debounce(filters_with_bmi(20.0, 25.0), 0) < 0.1
+    assert session_state["applied_filters"] == app.normalize_filters(filters_with_bmi(20.0, 25.0))
+
+
+def test_debounce_holds_a_run_whose_filters_changed(session_state):
+    session_state["applied_filters"] = app.normalize_filters(filters_with_bmi(18.0, 35.0))
+    assert timed_debounce(filters_with_bmi(20.0, 25.0), 0.2) >= 0.2
@@ -0,0 +1,27 @@
+import pandas as pd
+
+import app
+from tools.bench_neighbors import random_profiles
+
+
+def test_indexed_lookup_returns_the_same_rows_as_a_scan():
+    df = random_profiles(20_000, seed=0)
+    index = app.NeighborIndex(df)
+    for _, profile in random_profiles(50, seed=1).iterrows():
+        scan = app.find_nearest(df, profile)
+        indexed = app.find_nearest(df, profile, index)
+        assert list(indexed.index) == list(scan.index)
+
+
+def test_ties_at_the_kth_distance_are_broken_by_row_order():
+    # Every row is equally far from the profile, so the first k rows must win
+    df = pd.DataFrame({column: [1.0] * 200 for column in app.NEIGHBOR_WEIGHTS})
+    profile = {column: 0.0 for column in app.NEIGHBOR_WEIGHTS}
+    nearest = app.find_nearest(df, profile, app.NeighborIndex(df), k=10)
+    assert list(nearest.index) == list(range(10))
+
+
+def test_small_datasets_return_every_row():
+    df = random_profiles(5, seed=2)
+    profile = random_profiles(1, seed=3).iloc[0]
+    assert len(app.find_nearest(df, profile, app.NeighborIndex(df))) == 5
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+@pytest.fixture
+def profiles(dataset):
+    profiles = dataset[list(app.NEIGHBOR_WEIGHTS)].head(4).astype("float64").reset_index(drop=True)
+    profiles.loc[1, "BMI"] = np.nan
+    profiles.loc[3, "Sleep_Hours_Per_Day"] = np.inf
+    return profiles
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_incomplete_profiles_get_nan_predictions(dataset, profiles, use_index):
+    index = app.NeighborIndex(dataset) if use_index else None
+    results = app.predict_profiles(dataset, profiles, index)
+    
+    predicted = list(app.PREDICTED_METRICS.values()) + ["Health_Risk_Score"]
+    assert results.loc[[1, 3], predicted].isna().all().all()
+    assert results.loc[[0, 2], predicted].notna().all().all()
+
+
+def test_complete_profiles_are_unaffected_by_incomplete_ones(dataset, profiles):
+    alone = app.predict_profiles(dataset, profiles.loc[[0, 2]])
+    mixed = app.predict_profiles(dataset, profiles).loc[[0, 2]]
+    pd.testing.assert_frame_equal(alone, mixed)
+
+
+def test_batch_matches_the_page_lookup(dataset):
+    profiles = dataset[list(app.NEIGHBOR_WEIGHTS)].sample(20, random_state=0).reset_index(drop=True)
+    results = app.predict_profiles(dataset, profiles)
+    for i, profile in profiles.iterrows():
+        nearest = app.find_nearest(dataset, profile)
+        assert results.loc[i, "Predicted_Health_Score"] == pytest.approx(nearest["Overall_Health_Score"].mean())
+
+
+def test_missing_columns_raise(dataset):
+    with pytest.raises(ValueError, match="BMI"):
+        app.predict_profiles(dataset, pd.DataFrame({"Age": [30]}))
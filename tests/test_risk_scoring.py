@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+def row_wise_health_risk(row):
+    """The original per-row scoring, kept as the reference for the vectorized rules"""
+    score = 0
+    
+    if row["BMI"] > 30:
+        score += 25
+    elif row["BMI"] > 25:
+        score += 15
+    elif row["BMI"] > 22:
+        score += 8
+    
+    if row["Fast_Food_Meals_Per_Week"] > 10:
+        score += 20
+    elif row["Fast_Food_Meals_Per_Week"] > 6:
+        score += 12
+    elif row["Fast_Food_Meals_Per_Week"] > 3:
+        score += 6
+    
+    if row["Sleep_Hours_Per_Day"] < 5:
+        score += 15
+    elif row["Sleep_Hours_Per_Day"] < 6:
+        score += 10
+    elif row["Sleep_Hours_Per_Day"] < 7:
+        score += 5
+    
+    if row["Physical_Activity_Hours_Per_Week"] < 1:
+        score += 10
+    elif row["Physical_Activity_Hours_Per_Week"] < 3:
+        score += 6
+    elif row["Physical_Activity_Hours_Per_Week"] < 5:
+        score += 3
+    
+    if row["Energy_Level_Score"] < 3:
+        score += 10
+    elif row["Energy_Level_Score"] < 5:
+        score += 6
+    elif row["Energy_Level_Score"] < 7:
+        score += 3
+    
+    return min(score, 100)
+
+
+def edge_values(column):
+    """Every threshold of a column, a hair either side of it, NaN and values outside all thresholds"""
+    thresholds = [threshold for rule_column, _, rules in app.RISK_RULES if rule_column == column
+                  for threshold, _ in rules]
+    values = [np.nan, -1.0, 0.0, 1000.0]
+    for threshold in thresholds:
+        values += [threshold, np.nextafter(threshold, -np.inf), np.nextafter(threshold, np.inf)]
+    return values
+
+
+def random_profiles(rows, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: rng.choice(edge_values(column), rows) for column in app.RISK_COLUMNS})
+    # Mix in continuous values so rows are not only edge cases
+    continuous = rng.random(rows) < 0.5
+    df.loc[continuous, "BMI"] = rng.uniform(15, 40, continuous.sum())
+    return df
+
+
+def assert_matches_row_wise(df):
+    expected = df.apply(row_wise_health_risk, axis=1).to_numpy()
+    np.testing.assert_array_equal(app.score_health_risk(df), expected)
+
+
+@pytest.mark.parametrize("column", [column for column, _, _ in app.RISK_RULES])
+def test_each_threshold_edge_matches_row_wise(column):
+    values = edge_values(column)
+    df = pd.DataFrame({other: [np.nan] * len(values) for other in app.RISK_COLUMNS})
+    df[column] = values
+    assert_matches_row_wise(df)
+
+
+def test_random_edge_combinations_match_row_wise():
+    assert_matches_row_wise(random_profiles(5000, seed=0))
+
+
+def test_all_nan_row_scores_zero():
+    df = pd.DataFrame({column: [np.nan] for column in app.RISK_COLUMNS})
+    assert app.score_health_risk(df).tolist() == [0]
+
+
+def test_highest_risk_row_scores_sum_of_top_points():
+    row = {'BMI': 35, 'Fast_Food_Meals_Per_Week': 14, 'Sleep_Hours_Per_Day': 4,
+           'Physical_Activity_Hours_Per_Week': 0, 'Energy_Level_Score': 1}
+    assert app.calculate_health_risk(row) == row_wise_health_risk(row) == 80
+
+
+def test_single_row_wrapper_matches_row_wise():
+    df = random_profiles(200, seed=1)
+    for _, row in df.iterrows():
+        assert app.calculate_health_risk(row) == row_wise_health_risk(row)
+
+
+def test_dataset_scores_match_row_wise():
+    df = pd.read_csv(app.DATA_PATH)
+    assert_matches_row_wise(df)
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+
+
+@pytest.fixture
+def raw():
+    return pd.read_csv(app.DATA_PATH, nrows=50)
+
+
+def test_bundled_data_converts_to_the_schema_dtypes(raw):
+    df = app.enforce_schema(raw.copy())
+    for column, (dtype, allowed) in app.DATA_SCHEMA.items():
+        expected = pd.CategoricalDtype(allowed) if dtype == "category" else np.dtype(dtype)
+        assert df[column].dtype == expected, column
+    pd.testing.assert_frame_equal(df.astype(raw.dtypes.to_dict()), raw, check_categorical=False)
+
+
+def set_value(column, value):
+    def change(df):
+        if isinstance(value, str):
+            df[column] = df[column].astype(object)
+        df.loc[3, column] = value
+        return df
+    return change
+
+
+@pytest.mark.parametrize("change, message", [
+    (set_value("Age", 130), "Age: 1 values outside 0–120"),
+    (set_value("Energy_Level_Score", 0), "Energy_Level_Score: 1 values outside 1–10"),
+    (set_value("Gender", "Unknown"), "Gender: unexpected values ['Unknown']"),
+    (set_value("BMI", np.nan), "BMI: 1 missing values"),
+    (lambda df: df.assign(Fast_Food_Meals_Per_Week=df["Fast_Food_Meals_Per_Week"] + 0.5),
+     "Fast_Food_Meals_Per_Week: non-integer values"),
+    (set_value("Sleep_Hours_Per_Day", "seven"), "Sleep_Hours_Per_Day: expected numbers, got object"),
+    (lambda df: df.drop(columns="Digestive_Issues"), "Digestive_Issues: missing column"),
+])
+def test_schema_problems_are_reported(raw, change, message):
+    with pytest.raises(ValueError, match="Dataset does not match the expected schema") as error:
+        app.validate_schema(change(raw))
+    assert message in str(error.value)
+
+
+def test_every_problem_is_listed_at_once(raw):
+    raw.loc[0, "Age"] = 500
+    raw = raw.drop(columns="Gender")
+    with pytest.raises(ValueError) as error:
+        app.validate_schema(raw)
+    assert "Age: 1 values outside" in str(error.value)
+    assert "Gender: missing column" in str(error.value)
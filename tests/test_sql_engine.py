@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import app
+from conftest import default_filters
+from tools.check_engine import random_filters
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    cache_dir = str(tmp_path_factory.mktemp("columnar"))
+    return app.get_sql_engine(app.get_dataset_version(app.DATA_PATH), app.DATA_PATH, cache_dir)
+
+
+@pytest.fixture(scope="module")
+def profile(dataset):
+    return app.DatasetProfile.from_frame(dataset)
+
+
+def assert_engines_agree(dataset, engine, filters):
+    expected = app.DashboardAggregates.from_frame(app.apply_filters(dataset, filters))
+    assert app.aggregates_difference(expected, engine.aggregates(filters)) < 1e-9, filters
+
+
+def test_random_filter_selections_match_pandas(dataset, engine, profile):
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        assert_engines_agree(dataset, engine, random_filters(profile, rng))
+
+
+@pytest.mark.parametrize("changes", [
+    {'digestive': []},
+    {'digestive': ["Yes"]},
+    {'gender': "Female"},
+    {'gender': "Male", 'bmi': (22.0, 28.0)},
+    {'age': (20.5, 40.5), 'fastfood': (2.5, 7.5), 'energy': (3.5, 8.5)},
+    {'age': (30.0, 30.0), 'fastfood': (4.0, 4.0)},
+])
+def test_edge_case_selections_match_pandas(dataset, engine, profile, changes):
+    filters = {**default_filters(profile), **changes}
+    assert_engines_agree(dataset, engine, filters)
@@ -0,0 +1,101 @@
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+import app
+from conftest import default_filters
+
+
+@pytest.fixture(scope="module")
+def big_csv(tmp_path_factory):
+    """The bundled dataset repeated to 200k rows"""
+    df = pd.read_csv(app.DATA_PATH)
+    path = tmp_path_factory.mktemp("streaming") / "data.csv"
+    pd.concat([df] * (200_000 // len(df)), ignore_index=True).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def full_frame(big_csv):
+    return app.add_derived_columns(app.enforce_schema(pd.read_csv(big_csv)))
+
+
+def assert_aggregates_equal(expected, actual):
+    assert expected.count == actual.count
+    assert app.aggregates_difference(expected, actual) < 1e-9
+
+
+def test_streamed_aggregates_match_in_memory(big_csv, full_frame):
+    filters = default_filters(app.DatasetProfile.from_frame(full_frame))
+    filters['bmi'] = (22.0, 30.0)
+    filters['gender'] = "Female"
+    expected = app.DashboardAggregates.from_frame(app.apply_filters(full_frame, filters))
+    assert_aggregates_equal(expected, app.stream_aggregates(big_csv, filters, chunk_rows=7_000))
+
+
+def test_merged_halves_equal_one_pass(full_frame):
+    half = len(full_frame) // 2
+    merged = app.DashboardAggregates.from_frame(full_frame.iloc[:half])
+    merged.merge(app.DashboardAggregates.from_frame(full_frame.iloc[half:]))
+    merged.merge(app.DashboardAggregates())
+    assert_aggregates_equal(app.DashboardAggregates.from_frame(full_frame), merged)
+
+
+def test_running_sums_give_the_pandas_std(big_csv, full_frame):
+    cube = app.AggregateCube.from_chunks(app.iter_chunks(big_csv, 7_000))
+    engines = [
+        app.DashboardAggregates.from_frame(full_frame),
+        app.stream_aggregates(big_csv, chunk_rows=7_000),
+        cube.rollup(default_filters(app.DatasetProfile.from_cube(cube))),
+    ]
+    for aggregates in engines:
+        for column in app.MEAN_COLUMNS:
+            assert aggregates.std(column) == pytest.approx(full_frame[column].astype("float64").std(), rel=1e-9)
+    
+    single = app.DashboardAggregates.from_frame(full_frame.head(1))
+    assert pd.isna(single.std("BMI"))
+
+
+def test_streamed_profile_spans_the_whole_file(big_csv, full_frame):
+    profile = app.DatasetProfile.from_cube(app.AggregateCube.from_chunks(app.iter_chunks(big_csv, 7_000)))
+    full = app.DatasetProfile.from_frame(full_frame)
+    
+    assert profile.rows == len(full_frame)
+    for column in app.RANGE_FILTERS.values():
+        assert profile.range(column) == full.range(column)
+    assert profile.mean("BMI") == pytest.approx(full.mean("BMI"))
+    assert sorted(profile.values("Gender")) == sorted(full.values("Gender"))
+
+
+def test_default_filters_roll_up_every_row_from_the_cube(big_csv, full_frame):
+    cube = app.AggregateCube.from_chunks(app.iter_chunks(big_csv, 7_000))
+    aggregates = cube.rollup(default_filters(app.DatasetProfile.from_cube(cube)))
+    assert aggregates is not None
+    assert aggregates.count == len(full_frame)
+
+
+def test_sample_ranges_would_drop_rows(big_csv, full_frame):
+    """The bug the streamed profile fixes: a sample's ranges cut off rows outside it"""
+    sample = app.stream_sample(big_csv, sample_rows=100, chunk_rows=7_000)
+    filters = default_filters(app.DatasetProfile.from_frame(sample))
+    assert len(app.apply_filters(full_frame, filters)) < len(full_frame)
+
+
+def streaming_peak_bytes(path, chunk_rows):
+    tracemalloc.start()
+    try:
+        app.stream_aggregates(path, chunk_rows=chunk_rows)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_streaming_peak_memory_does_not_grow_with_the_file(big_csv, tmp_path):
+    half_csv = str(tmp_path / "half.csv")
+    pd.read_csv(big_csv, nrows=100_000).to_csv(half_csv, index=False)
+    
+    half_peak = streaming_peak_bytes(half_csv, chunk_rows=5_000)
+    full_peak = streaming_peak_bytes(big_csv, chunk_rows=5_000)
+    # Loading the file whole would double the peak along with the row count
+    assert full_peak < half_peak * 1.25, (half_peak, full_peak)
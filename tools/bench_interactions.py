@@ -0,0 +1,171 @@
+"""Script runs and server CPU caused by slider edits under each filter mode, against a real server
+
+    python tools/bench_interactions.py --steps 20 --interval 0.25
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+
+import pandas as pd
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from websockets.asyncio.client import connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+import app  # noqa: E402
+
+# Slider the interaction test moves, and the filter settings it compares: (filter mode, debounce ms)
+INTERACTION_SLIDER = "⚖️ BMI Range"
+INTERACTION_MODES = {
+    "live": ("live", 0),
+    "debounced": ("live", app.FILTER_DEBOUNCE_MS),
+    "submit": ("submit", 0),
+}
+
+
+def process_cpu_seconds(pid):
+    """User plus system CPU time of a process, from /proc (Linux only)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+@contextmanager
+def app_server(port, env):
+    """A headless Streamlit server running the app, stopped on exit"""
+    server = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_PATH,
+         "--server.headless", "true", "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.perf_counter() + 60
+        while True:
+            try:
+                urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1)
+                break
+            except OSError:
+                if server.poll() is not None or time.perf_counter() > deadline:
+                    raise RuntimeError("Streamlit server did not start")
+                time.sleep(0.2)
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def drive_slider(port, server_pid, mode, steps, interval, settle=1.5):
+    """Nudge the interaction slider steps times, as a browser session would, and count the runs it causes"""
+    async with connect(f"ws://localhost:{port}/_stcore/stream", max_size=None) as ws:
+        widgets, runs = {}, []
+        activity = asyncio.Event()
+        
+        async def read():
+            async for raw in ws:
+                msg = ForwardMsg()
+                msg.ParseFromString(raw)
+                kind = msg.WhichOneof("type")
+                if kind == "new_session":
+                    runs.append({'rendered': False, 'finished': False})
+                elif kind == "script_finished":
+                    runs[-1]['finished'] = msg.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY
+                elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                    element_type = msg.delta.new_element.WhichOneof("type")
+                    element = getattr(msg.delta.new_element, element_type) if element_type else None
+                    if element_type == "plotly_chart":
+                        runs[-1]['rendered'] = True
+                    elif hasattr(element, "label") and hasattr(element, "id"):
+                        widgets[element.label] = element
+                activity.set()
+        
+        async def settled():
+            # Done once the last run has finished and the server has gone quiet
+            while True:
+                activity.clear()
+                try:
+                    await asyncio.wait_for(activity.wait(), settle)
+                except asyncio.TimeoutError:
+                    if runs and runs[-1]['finished']:
+                        return
+        
+        async def rerun(*states):
+            back = BackMsg()
+            back.rerun_script.widget_states.SetInParent()
+            for widget_id, field, value in states:
+                state = back.rerun_script.widget_states.widgets.add(id=widget_id)
+                if field == "double_array_value":
+                    state.double_array_value.data.extend(value)
+                else:
+                    setattr(state, field, value)
+            await ws.send(back.SerializeToString())
+        
+        reader = asyncio.ensure_future(read())
+        await rerun()
+        await settled()
+        
+        slider = widgets[INTERACTION_SLIDER]
+        low, high = slider.default
+        step = (high - low) / (2 * steps)
+        runs.clear()
+        cpu_start = process_cpu_seconds(server_pid)
+        
+        for i in range(1, steps + 1):
+            value = [low, round(high - i * step, 1)]
+            # Form widgets stay in the browser until the form is submitted
+            if mode != "submit":
+                await rerun((slider.id, "double_array_value", value))
+            await asyncio.sleep(interval)
+        if mode == "submit":
+            await rerun((slider.id, "double_array_value", value), (widgets["✅ Apply Filters"].id, "trigger_value", True))
+        
+        await settled()
+        cpu = process_cpu_seconds(server_pid) - cpu_start
+        reader.cancel()
+    
+    return {
+        'adjustments': steps,
+        'runs_started': len(runs),
+        'runs_finished': sum(run['finished'] for run in runs),
+        'runs_rendered': sum(run['rendered'] for run in runs),
+        'server_cpu_s': cpu,
+        'cpu_per_adjustment_ms': cpu / steps * 1000,
+    }
+
+
+def run_interaction_test(modes, steps, interval, port):
+    """Script runs and server CPU caused by the same slider interaction under each filter mode"""
+    results = []
+    for name in modes:
+        filter_mode, debounce_ms = INTERACTION_MODES[name]
+        env = {'SNACKALYZE_FILTER_MODE': filter_mode, 'SNACKALYZE_FILTER_DEBOUNCE_MS': str(debounce_ms)}
+        with app_server(port, env) as server:
+            result = asyncio.run(drive_slider(port, server.pid, filter_mode, steps, interval))
+        results.append({'mode': name, 'debounce_ms': debounce_ms, **result})
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count reruns and server CPU caused by slider edits in each filter mode")
+    parser.add_argument("--modes", default=",".join(INTERACTION_MODES), help="Comma-separated modes to compare")
+    parser.add_argument("--steps", type=int, default=20, help="Slider adjustments per session")
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between adjustments")
+    parser.add_argument("--port", type=int, default=8599, help="Port for the temporary server")
+    args = parser.parse_args(argv)
+    
+    modes = args.modes.split(",")
+    unknown = [mode for mode in modes if mode not in INTERACTION_MODES]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+    print(run_interaction_test(modes, args.steps, args.interval, args.port).to_string(index=False, float_format="%.2f"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""Nearest-profile lookup latency: full scan against the KD-tree index
+
+    python tools/bench_neighbors.py --rows 1000 100000 5000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+
+def random_profiles(rows, seed=0):
+    """Profiles with the dataset's value ranges and resolution, so ties occur as they do in real data"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Age': rng.integers(18, 80, rows),
+        'BMI': rng.uniform(16, 40, rows).round(1),
+        'Fast_Food_Meals_Per_Week': rng.integers(0, 15, rows),
+        'Sleep_Hours_Per_Day': rng.uniform(4, 9, rows).round(1),
+        'Physical_Activity_Hours_Per_Week': rng.uniform(0, 10, rows).round(1),
+        'Energy_Level_Score': rng.integers(1, 11, rows),
+    })
+
+
+def time_queries(df, queries, index):
+    start = time.perf_counter()
+    for _, profile in queries.iterrows():
+        app.find_nearest(df, profile, index)
+    return (time.perf_counter() - start) / len(queries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark find_nearest with and without the KD-tree")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 5_000_000])
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args(argv)
+    
+    queries = random_profiles(args.queries, seed=1)
+    # Import scipy before the first timed build
+    app.NeighborIndex(queries)
+    print(f"{'rows':>12} {'build (ms)':>11} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    for rows in args.rows:
+        df = random_profiles(rows)
+        start = time.perf_counter()
+        index = app.NeighborIndex(df)
+        build = time.perf_counter() - start
+        scan = time_queries(df, queries, None)
+        indexed = time_queries(df, queries, index)
+        print(f"{rows:>12,} {build * 1000:>11.1f} {scan * 1000:>10.2f} {indexed * 1000:>11.2f} {scan / indexed:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Rows per second of the vectorized health risk scoring
+
+    python tools/bench_risk_scoring.py --rows 10000 1000000 10000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+
+def random_profiles(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'BMI': rng.uniform(15, 40, rows),
+        'Fast_Food_Meals_Per_Week': rng.integers(0, 15, rows),
+        'Sleep_Hours_Per_Day': rng.uniform(4, 9, rows),
+        'Physical_Activity_Hours_Per_Week': rng.uniform(0, 10, rows),
+        'Energy_Level_Score': rng.integers(1, 11, rows),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark score_health_risk")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs per size")
+    args = parser.parse_args(argv)
+    
+    print(f"{'rows':>12} {'best (ms)':>10} {'rows/s':>14}")
+    for rows in args.rows:
+        df = random_profiles(rows)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            app.score_health_risk(df)
+            best = min(best, time.perf_counter() - start)
+        print(f"{rows:>12,} {best * 1000:>10.1f} {rows / best:>14,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
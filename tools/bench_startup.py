@@ -0,0 +1,80 @@
+"""Cold import time of each heavy module and time to first render of each page, in fresh processes
+
+    python tools/bench_startup.py --repeat 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+# Heavy modules a cold worker may import, and what a fresh process loads per first page render
+STARTUP_MODULES = [
+    "streamlit", "pandas", "numpy", "pyarrow", "scipy.spatial",
+    "plotly.express", "plotly.graph_objects", "google.generativeai",
+]
+STARTUP_PAGES = ["Dashboard", "Insights", "Personalized Health", "Data"]
+STARTUP_RENDER_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({path!r}, default_timeout=120)
+app.session_state["page"] = {page!r}
+start = time.perf_counter()
+app.run()
+print(json.dumps({{
+    "seconds": time.perf_counter() - start,
+    "failed": bool(app.exception),
+    "loaded": [m for m in {modules!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_fresh_python(code):
+    """Run code in a new interpreter and return the JSON it prints last"""
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure_import_times(modules, repeat):
+    """Median cold import time of each module, each in a fresh interpreter"""
+    code = "import json, time; t = time.perf_counter(); import {}; print(json.dumps(time.perf_counter() - t))"
+    return pd.DataFrame({
+        'module': modules,
+        'import_s': [np.median([run_fresh_python(code.format(m)) for _ in range(repeat)]) for m in modules],
+    })
+
+
+def measure_first_renders(pages, repeat):
+    """Median time of a cold process's first script run on each page, and the heavy modules it loaded"""
+    results = []
+    for page in pages:
+        code = STARTUP_RENDER_SCRIPT.format(path=APP_PATH, page=page, modules=STARTUP_MODULES)
+        runs = [run_fresh_python(code) for _ in range(repeat)]
+        if any(run['failed'] for run in runs):
+            raise RuntimeError(f"{page} page raised during its first render")
+        results.append({
+            'page': page,
+            'first_render_s': np.median([run['seconds'] for run in runs]),
+            'heavy_modules': ", ".join(runs[-1]['loaded']),
+        })
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold import times and time to first render per page")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh processes per measurement (median is reported)")
+    args = parser.parse_args(argv)
+    
+    print(measure_import_times(STARTUP_MODULES, args.repeat).to_string(index=False, float_format="%.3f"))
+    print()
+    print(measure_first_renders(STARTUP_PAGES, args.repeat).to_string(index=False, float_format="%.3f"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""DuckDB aggregates against the pandas reference on random filter selections
+
+    python tools/check_engine.py --samples 200
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app  # noqa: E402
+
+
+def random_filters(profile, rng):
+    """Random sidebar filter selection within the dataset's ranges"""
+    filters = {'gender': rng.choice(["All"] + profile.values("Gender"))}
+    for key, column in app.RANGE_FILTERS.items():
+        low, high = profile.range(column)
+        # Full range about half the time, like a user who only touches a few sliders
+        if rng.random() < 0.5:
+            filters[key] = (low, high)
+        else:
+            # One decimal place so bounds regularly land exactly on integer values
+            ends = np.round(np.sort(rng.uniform(low, high, 2)), 1)
+            filters[key] = (float(ends[0]), float(ends[1]))
+    filters['digestive'] = [value for value in profile.values("Digestive_Issues") if rng.random() < 0.8]
+    return filters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare DuckDB aggregates against the pandas reference")
+    parser.add_argument("--samples", type=int, default=200, help="Random filter selections to compare")
+    parser.add_argument("--data", default=app.DATA_PATH, help="Dataset to query")
+    parser.add_argument("--tolerance", type=float, default=1e-9, help="Largest allowed relative difference")
+    args = parser.parse_args(argv)
+    
+    df = app.add_derived_columns(app.read_columnar(args.data))
+    profile = app.DatasetProfile.from_frame(df)
+    engine = app.get_sql_engine(app.get_dataset_version(args.data), args.data)
+    rng = np.random.default_rng(0)
+    
+    worst, mismatches = 0.0, 0
+    for _ in range(args.samples):
+        filters = random_filters(profile, rng)
+        difference = app.aggregates_difference(
+            app.DashboardAggregates.from_frame(app.apply_filters(df, filters)),
+            engine.aggregates(filters)
+        )
+        worst = max(worst, difference)
+        if difference > args.tolerance:
+            mismatches += 1
+            print(f"mismatch ({difference:.3g}): {filters}", file=sys.stderr)
+    
+    print(f"{args.samples} filter selections, {mismatches} mismatches, largest relative difference {worst:.3g}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
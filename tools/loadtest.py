@@ -0,0 +1,83 @@
+"""End-to-end latency of the AI pages under concurrent sessions, against the offline backend
+
+    python tools/loadtest.py --page "Personalized Health" --sessions 16 --concurrency 1,4,16 --latency 1.0
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+import app  # noqa: E402
+
+# Button each load-test session clicks on its page
+LOAD_TEST_ACTIONS = {
+    "Dashboard": "🤖 Generate Smart Health Recommendations",
+    "Personalized Health": "🔮 Predict My Health Profile",
+}
+
+
+def simulate_session(page):
+    """Drive one scripted session through a page's AI action and return its latency in seconds"""
+    from streamlit.testing.v1 import AppTest
+    
+    session = AppTest.from_file(APP_PATH, default_timeout=app.AI_TIMEOUT_SECONDS + 30)
+    session.run()
+    session.sidebar.radio[0].set_value(page).run()
+    button = next(b for b in session.button if b.label == LOAD_TEST_ACTIONS[page])
+    
+    start = time.perf_counter()
+    button.click().run()
+    elapsed = time.perf_counter() - start
+    
+    if session.exception:
+        raise RuntimeError(session.exception[0].message)
+    return elapsed
+
+
+def run_load_test(page, sessions, concurrency_levels):
+    """End-to-end latency percentiles and throughput at each concurrency level"""
+    results = []
+    for concurrency in concurrency_levels:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            latencies = list(pool.map(lambda _: simulate_session(page), range(sessions)))
+            wall = time.perf_counter() - start
+        results.append({
+            'concurrency': concurrency,
+            'sessions': sessions,
+            'p50_s': np.percentile(latencies, 50),
+            'p95_s': np.percentile(latencies, 95),
+            'max_s': max(latencies),
+            'sessions_per_s': sessions / wall,
+        })
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure AI page latency against the offline backend")
+    parser.add_argument("--page", choices=list(LOAD_TEST_ACTIONS), default="Personalized Health")
+    parser.add_argument("--sessions", type=int, default=16, help="Sessions per concurrency level")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--latency", type=float, default=app.OFFLINE_LATENCY_SECONDS, help="Simulated model latency in seconds")
+    parser.add_argument("--with-cache", action="store_true", help="Let repeated prompts hit the response cache")
+    args = parser.parse_args(argv)
+    
+    # Read by each simulated session when it executes the app script
+    os.environ["SNACKALYZE_AI_BACKEND"] = "offline"
+    os.environ["SNACKALYZE_OFFLINE_LATENCY_SECONDS"] = str(args.latency)
+    if not args.with_cache:
+        os.environ["SNACKALYZE_AI_CACHE_TTL_HOURS"] = "0"
+    levels = [int(level) for level in args.concurrency.split(",")]
+    print(run_load_test(args.page, args.sessions, levels).to_string(index=False, float_format="%.3f"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())